@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import io
+import logging
+import os
+import numpy as np
+import pandas as pd
+import ccxt.async_support as ccxt
+from config import settings
+from indicators.technical_indicators import calculate_indicators
+from ML.features import frame_features
+from trading.market_data import timeframe_to_ms
+from trading.state import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_ohlcv_range(exchange, pair, timeframe, since, until, page_limit=1000):
+    """
+    Fetch all candles of a timeframe opening in [since, until), page by page.
+    """
+    step = timeframe_to_ms(timeframe)
+    rows = []
+    cursor = since
+    while cursor < until:
+        page = await exchange.fetch_ohlcv(pair, timeframe=timeframe, since=cursor, limit=page_limit)
+        if not page:
+            break
+        rows.extend(row for row in page if row[0] < until)
+        if page[-1][0] + step <= cursor:
+            break
+        cursor = page[-1][0] + step
+    return rows
+
+
+def indicator_frame(rows, vwap_window):
+    """
+    Build an indicator frame from OHLCV rows, matching what the live bot computes.
+
+    Live frames hold the last `vwap_window` candles, so the cumulative VWAP of the
+    latest live row equals a rolling VWAP over that window; the export uses the rolling
+    form so values do not depend on where a chunk starts.
+    """
+    df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.set_index('timestamp').ffill()
+    df = calculate_indicators(df)
+    turnover = (df['close'] * df['volume']).rolling(vwap_window, min_periods=1).sum()
+    df['vwap'] = turnover / df['volume'].rolling(vwap_window, min_periods=1).sum()
+    return df
+
+
+def aligned_features(frames, timeframes, start_ms, end_ms, now_ms, vwap_window):
+    """
+    Join each closed base bar with the latest closed bar of every higher timeframe.
+
+    A higher-timeframe bar is only used once its close time is at or before the base
+    bar's close time, so no row sees data from the future.
+
+    Parameters:
+        frames (dict): Timeframe -> OHLCV rows covering the chunk plus warmup.
+        timeframes (list): Base timeframe first, then higher timeframes.
+        start_ms, end_ms (int): Base bars opening in [start_ms, end_ms) are emitted.
+        now_ms (int): Bars closing after this instant are still open and dropped.
+
+    Returns:
+        pd.DataFrame: One row per base bar.
+    """
+    base_timeframe = timeframes[0]
+    aligned = None
+    for timeframe in timeframes:
+        rows = frames.get(timeframe)
+        if not rows:
+            return pd.DataFrame()
+        df = indicator_frame(rows, vwap_window)
+        features = frame_features(df).add_prefix(f"{timeframe}_")
+        features['close_time'] = df.index + pd.Timedelta(milliseconds=timeframe_to_ms(timeframe))
+        features = features[features['close_time'] <= pd.Timestamp(now_ms, unit='ms')]
+
+        if timeframe == base_timeframe:
+            in_chunk = (features.index >= pd.Timestamp(start_ms, unit='ms')) & (features.index < pd.Timestamp(end_ms, unit='ms'))
+            features = features[in_chunk].copy()
+            features.insert(0, 'close', df['close'].reindex(features.index))
+            aligned = features.reset_index()
+        else:
+            aligned = pd.merge_asof(
+                aligned.sort_values('close_time'),
+                features.reset_index(drop=True).sort_values('close_time'),
+                on='close_time',
+                direction='backward',
+                allow_exact_matches=True,
+            )
+    return aligned
+
+
+def write_chunk(df, path, file_format):
+    """
+    Write one chunk atomically, so an interrupted export never leaves a truncated part file that a rerun would skip.
+    """
+    buffer = io.BytesIO()
+    if file_format == 'parquet':
+        df.to_parquet(buffer, index=False)
+    elif file_format == 'npz':
+        columns = {column: (df[column].astype('int64').to_numpy() if np.issubdtype(df[column].dtype, np.datetime64)
+                            else df[column].to_numpy()) for column in df.columns}
+        np.savez_compressed(buffer, **columns)
+    else:
+        raise ValueError(f"Unsupported export format: {file_format}")
+    atomic_write(path, buffer.getvalue())
+
+
+async def export_pair(exchange, pair, since_ms, until_ms, out_dir, timeframes=None, chunk_bars=None,
+                      warmup_bars=None, file_format=None, semaphore=None):
+    """
+    Stream aligned feature rows for one pair into chunked columnar files.
+
+    Only one chunk (plus its indicator warmup) is held in memory at a time, so memory
+    stays bounded regardless of the history length. Existing full chunk files are
+    skipped, which lets an interrupted export resume.
+
+    Returns:
+        int: Number of rows written.
+    """
+    timeframes = sorted(timeframes or settings.TIMEFRAMES, key=timeframe_to_ms)
+    chunk_bars = chunk_bars or settings.FEATURE_EXPORT_CHUNK_BARS
+    warmup_bars = warmup_bars or settings.FEATURE_EXPORT_WARMUP_BARS
+    file_format = file_format or settings.FEATURE_EXPORT_FORMAT
+    base_ms = timeframe_to_ms(timeframes[0])
+    pair_dir = os.path.join(out_dir, pair.replace('/', '_'))
+    os.makedirs(pair_dir, exist_ok=True)
+
+    loop = asyncio.get_running_loop()
+    written = 0
+    chunk_start = since_ms // base_ms * base_ms
+    chunk_index = 0
+    while chunk_start < until_ms:
+        chunk_end = min(chunk_start + chunk_bars * base_ms, until_ms)
+        path = os.path.join(pair_dir, f"part-{chunk_index:05d}.{file_format}")
+        full_chunk = chunk_end - chunk_start == chunk_bars * base_ms
+        if not (full_chunk and os.path.exists(path)):
+            async with semaphore or asyncio.Semaphore(1):
+                frames = {}
+                for timeframe in timeframes:
+                    warmup_start = chunk_start - warmup_bars * timeframe_to_ms(timeframe)
+                    frames[timeframe] = await fetch_ohlcv_range(exchange, pair, timeframe, warmup_start, chunk_end)
+                now_ms = exchange.milliseconds()
+                df = await loop.run_in_executor(None, aligned_features, frames, timeframes, chunk_start, chunk_end,
+                                                now_ms, settings.WS_CANDLE_LIMIT)
+                del frames
+            if not df.empty:
+                await loop.run_in_executor(None, write_chunk, df, path, file_format)
+                written += len(df)
+                logger.info(f"{pair}: wrote {len(df)} rows to {path}")
+        chunk_start = chunk_end
+        chunk_index += 1
+    return written
+
+
+async def export_features(pairs, since_ms, until_ms, out_dir, exchange=None, concurrency=None, **kwargs):
+    """
+    Export aligned multi-timeframe features for several pairs in parallel.
+    """
+    own_exchange = exchange is None
+    if own_exchange:
+        exchange = ccxt.binance({'enableRateLimit': True})
+    semaphore = asyncio.Semaphore(concurrency or settings.FEATURE_EXPORT_CONCURRENCY)
+    try:
+        results = await asyncio.gather(
+            *(export_pair(exchange, pair, since_ms, until_ms, out_dir, semaphore=semaphore, **kwargs) for pair in pairs),
+            return_exceptions=True,
+        )
+    finally:
+        if own_exchange:
+            await exchange.close()
+
+    totals = {}
+    for pair, result in zip(pairs, results):
+        if isinstance(result, Exception):
+            logger.error(f"Feature export failed for {pair}: {result}")
+        else:
+            totals[pair] = result
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export time-aligned multi-timeframe feature rows.")
+    parser.add_argument('--pairs', nargs='+', default=settings.DESIRED_COINS)
+    parser.add_argument('--since', required=True, help="Start date, e.g. 2024-01-01")
+    parser.add_argument('--until', default=None, help="End date (default: now)")
+    parser.add_argument('--out', default=settings.FEATURE_EXPORT_DIR)
+    parser.add_argument('--timeframes', nargs='+', default=settings.TIMEFRAMES)
+    parser.add_argument('--chunk-bars', type=int, default=settings.FEATURE_EXPORT_CHUNK_BARS)
+    parser.add_argument('--concurrency', type=int, default=settings.FEATURE_EXPORT_CONCURRENCY)
+    parser.add_argument('--format', choices=['parquet', 'npz'], default=settings.FEATURE_EXPORT_FORMAT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    since_ms = int(pd.Timestamp(args.since, tz='UTC').timestamp() * 1000)
+    until_ms = int((pd.Timestamp(args.until, tz='UTC') if args.until else pd.Timestamp.now(tz='UTC')).timestamp() * 1000)
+    totals = asyncio.run(export_features(
+        args.pairs, since_ms, until_ms, args.out, concurrency=args.concurrency,
+        timeframes=args.timeframes, chunk_bars=args.chunk_bars, file_format=args.format,
+    ))
+    for pair, rows in totals.items():
+        logger.info(f"{pair}: {rows} rows exported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Scale-free per-bar features derived from the columns added by calculate_indicators
+FEATURE_COLUMNS = [
+    'return_1',
+    'rsi',
+    'macd_hist_pct',
+    'adx',
+    'di_spread',
+    'mfi',
+    'atr_pct',
+    'bb_position',
+    'vwap_distance',
+    'volume_ratio',
+]
+
+
+def frame_features(df):
+    """
+    Compute model features for every bar of an indicator frame.
+
+    Parameters:
+        df (pd.DataFrame): OHLCV frame with the indicator columns from calculate_indicators.
+
+    Returns:
+        pd.DataFrame: One row per bar with FEATURE_COLUMNS.
+    """
+    close = df['close']
+    band_width = (df['upper_band'] - df['lower_band']).replace(0, np.nan)
+    features = pd.DataFrame({
+        'return_1': close.pct_change(),
+        'rsi': df['rsi'],
+        'macd_hist_pct': df['macd_hist'] / close,
+        'adx': df['adx'],
+        'di_spread': df['+DI'] - df['-DI'],
+        'mfi': df['mfi'],
+        'atr_pct': df['atr'] / close,
+        'bb_position': (close - df['lower_band']) / band_width,
+        'vwap_distance': close / df['vwap'] - 1,
+        'volume_ratio': df['volume'] / df['volume'].rolling(20).mean(),
+    }, index=df.index)
+    return features[FEATURE_COLUMNS]
+
+
+def feature_names(timeframes):
+    return [f"{timeframe}_{column}" for timeframe in timeframes for column in FEATURE_COLUMNS]
+
+
+def latest_feature_vector(data, timeframes):
+    """
+    Feature vector of the latest closed bar across timeframes.
+
+    The last row of a live frame is the still-forming candle, so the second to last
+    row is used, matching the closed-bar rows produced by the feature exporter.
+
+    Parameters:
+        data (dict): Timeframe -> indicator DataFrame.
+        timeframes (list): Timeframes to include, in feature order.
+
+    Returns:
+        tuple: (timestamp of the base timeframe's closed bar, np.ndarray) or (None, None).
+    """
+    parts = []
+    bar_timestamp = None
+    for timeframe in timeframes:
+        df = data.get(timeframe)
+        if df is None or len(df) < 2:
+            return None, None
+        row = frame_features(df.tail(60)).iloc[-2]
+        if bar_timestamp is None:
+            bar_timestamp = row.name
+        parts.append(row.to_numpy(dtype=float))
+    return bar_timestamp, np.concatenate(parts)
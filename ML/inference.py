@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import settings
+from ML.features import latest_feature_vector
+
+logger = logging.getLogger(__name__)
+
+
+class LocalModelInference:
+    """
+    Batched local inference for the USE_ML path.
+
+    The pickled model at ML_MODEL_PATH is loaded once. Each evaluated pair contributes
+    the feature vector of its latest closed bar; all pairs with a bar that has not been
+    scored yet are predicted together in one call on a worker thread, and predictions
+    are cached per (pair, bar).
+    """
+
+    def __init__(self, model_path=None, timeframes=None, executor=None):
+        self.model_path = model_path or settings.ML_MODEL_PATH
+        self.timeframes = list(timeframes or settings.TIMEFRAMES)
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='ml-inference')
+        self.features = {}             # pair -> (bar timestamp, feature vector)
+        self.predictions = OrderedDict()  # (pair, bar timestamp) -> probability, LRU bounded
+        self.batches = 0
+        self._model = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+
+    def _load_model(self):
+        with self._load_lock:
+            if self._model is None and not self._load_failed:
+                try:
+                    with open(self.model_path, 'rb') as model_file:
+                        self._model = pickle.load(model_file)
+                    logger.info(f"Loaded ML model from {self.model_path}")
+                except Exception as e:
+                    self._load_failed = True
+                    logger.error(f"Could not load ML model from {self.model_path}: {e}")
+        return self._model
+
+    def _predict_matrix(self, matrix):
+        model = self._load_model()
+        if model is None:
+            return None
+        if hasattr(model, 'predict_proba'):
+            return np.asarray(model.predict_proba(matrix))[:, -1]
+        return np.clip(np.asarray(model.predict(matrix), dtype=float).ravel(), 0.0, 1.0)
+
+    def observe(self, pair, data):
+        """
+        Record the latest closed-bar features of a pair from its cached indicator frames.
+        """
+        bar_timestamp, vector = latest_feature_vector(data, self.timeframes)
+        if vector is not None and np.isfinite(vector).all():
+            self.features[pair] = (bar_timestamp, vector)
+
+    async def predict_pending(self):
+        """
+        Score every observed pair whose latest bar has no cached prediction, in one batched call.
+        """
+        pending = [(pair, bar) for pair, (bar, _) in self.features.items() if (pair, bar) not in self.predictions]
+        if not pending or self._load_failed:
+            return 0
+
+        matrix = np.vstack([self.features[pair][1] for pair, _ in pending])
+        loop = asyncio.get_running_loop()
+        probabilities = await loop.run_in_executor(self.executor, self._predict_matrix, matrix)
+        if probabilities is None:
+            return 0
+
+        self.batches += 1
+        for key, probability in zip(pending, probabilities):
+            self.predictions[key] = float(probability)
+        while len(self.predictions) > settings.ML_PREDICTION_CACHE_SIZE:
+            self.predictions.popitem(last=False)
+        return len(pending)
+
+    def prediction(self, pair):
+        entry = self.features.get(pair)
+        if entry is None:
+            return None
+        return self.predictions.get((pair, entry[0]))
+
+    async def predict(self, pair, data):
+        """
+        Observe a pair and return its model probability, batching with any other pending pairs.
+        """
+        self.observe(pair, data)
+        await self.predict_pending()
+        return self.prediction(pair)
@@ -15,13 +15,45 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 # Trading Parameters
 USE_ML = False  # Disabled for now, as you're not using ChatGPT or ML
 ML_MODEL_PATH = "data/ml_model.pkl"
+ML_BLEND_WEIGHT = 0.3  # Share of the local model probability in the blended buy/sell confidence
+ML_PREDICTION_CACHE_SIZE = 5000  # Cached (pair, bar) predictions
+
+# Multi-timeframe feature export (python -m ML.feature_export)
+FEATURE_EXPORT_DIR = "data/features"
+FEATURE_EXPORT_FORMAT = "parquet"  # "parquet" or "npz"
+FEATURE_EXPORT_CHUNK_BARS = 50000  # Base-timeframe rows per output file
+FEATURE_EXPORT_WARMUP_BARS = 1000  # Extra bars fetched before each chunk so indicators are settled
+FEATURE_EXPORT_CONCURRENCY = 4  # Pairs exported in parallel
+
 OPENAI_API_KEY = os.getenv('open_api_key')
 
 quote_currency = False  # If true, trade all pairs with the quote currency (e.g., USDT)
+UNIVERSE_REFRESH_INTERVAL = 3600  # Seconds between reloads of the quote-currency pairs (listings and delistings)
 INITIAL_INVESTMENT = 5.0  # USD
 STOP_LOSS_PERCENTAGE = 0.02  # 2%
 TAKE_PROFIT_PERCENTAGE = 0.05  # Initial take-profit percentage (5%)
 
+# Order execution
+ORDER_MAX_RETRIES = 3  # Resubmissions after network errors, each only after two lookups by client order ID miss the order
+ORDER_RETRY_BACKOFF = 0.5  # Seconds before re-querying a failed submission, doubled per retry
+ORDER_FILL_TIMEOUT = 10  # Seconds to wait for a submitted order to fill
+ORDER_FILL_POLL_INTERVAL = 0.25  # Seconds between fill checks
+CLIENT_ORDER_ID_PREFIX = "autobc"
+FLATTEN_ON_SHUTDOWN = False  # Sell all open positions on shutdown instead of resuming them after a restart
+
+# Crash-safe state for warm restarts
+STATE_JOURNAL_PATH = "data/state/journal.jsonl"  # Append-only log of positions and order events
+STATE_SNAPSHOT_PATH = "data/state/candles.pkl"  # Periodic snapshot of the candle caches
+STATE_SNAPSHOT_INTERVAL = 60  # Seconds between snapshots
+STATE_SNAPSHOT_MAX_AGE = 86400  # Older snapshots are ignored on startup
+
+# Portfolio allocation across simultaneous buy signals
+PORTFOLIO_TIMEFRAME = '5m'  # Bars used for the rolling return covariance (must be a feed timeframe)
+PORTFOLIO_WINDOW = 288  # Bars in the rolling window (one day of 5m bars)
+PORTFOLIO_MIN_OBSERVATIONS = 48  # Pairs with fewer observed bars are treated as uncorrelated
+PORTFOLIO_SHRINKAGE = 0.3  # Shrinkage of the covariance towards its diagonal
+PORTFOLIO_MAX_LAG_BARS = 3  # Caches at most this many bars behind hold the covariance update back until they catch up
+
 # Dynamic Profit-Taking Parameters
 PROFIT_STEP = 0.005  # 0.5% increment for positive indicator signals
 MAX_PROFIT_PERCENTAGE = 0.30  # Cap at 30% maximum profit
@@ -51,7 +83,48 @@ TIMEFRAMES_FALSE = [
     '1M'
 ]
 
+# Shared HTTP transport for the exchange and Telegram clients
+HTTP_POOL_LIMIT = 100  # Total pooled connections
+HTTP_LIMIT_PER_HOST = 20  # Concurrent connections per host
+HTTP_KEEPALIVE_TIMEOUT = 60  # Seconds an idle connection stays in the pool
+HTTP_DNS_CACHE_TTL = 300  # Seconds resolved addresses are cached
+HTTP_TIMEOUT = 10  # Total request timeout in seconds
+HTTP_CONNECT_TIMEOUT = 3  # Connection (including pool wait) timeout in seconds
+HTTP_LATENCY_SAMPLES = 500  # Latency samples kept per endpoint
+
+# CPU offload and event-loop diagnostics
+CPU_EXECUTOR = "thread"  # "thread", "process" or "inline" for frame building and signal evaluation
+CPU_WORKERS = 2
+LOOP_LAG_CHECK_INTERVAL = 0.1  # Seconds between event-loop lag samples
+LOOP_BLOCK_THRESHOLD = 0.5  # Seconds; the loop thread's stack is logged when a callback blocks longer
+PROFILE_DIR = "logs/profiles"  # Sweep profiles requested with SIGUSR1 or PROFILE_FLAG_FILE
+PROFILE_FLAG_FILE = "logs/profile_next_sweep"
+
+# WebSocket market-data feed (reads fall back to REST while a stream is cold or stale)
+USE_WEBSOCKET_FEED = True
+WS_BASE_URL = "wss://stream.binance.com:9443/stream"
+WS_MAX_STREAMS_PER_CONNECTION = 200  # Binance allows up to 1024 streams per connection
+WS_DEPTH_LEVELS = 20  # Partial book depth levels (5, 10 or 20)
+WS_CANDLE_LIMIT = 1000  # Candles kept per pair and timeframe
+WS_STALE_AFTER = 10  # Seconds without a message on a stream before falling back to REST
+WS_HEARTBEAT = 20  # Seconds between client pings; a missed pong drops the connection
+WS_RECONNECT_DELAY = 1  # Initial reconnect delay in seconds, doubled after each failure
+WS_MAX_RECONNECT_DELAY = 60
+
 TIMEFRAMES_FOR_SCORE = ['1m', '5m', '15m']
+CANDLE_CLOSE_GRACE_SECONDS = 2  # Wait after a bar boundary so the closed candle is available
+
+# Adaptive scan scheduling
+SCAN_MIN_INTERVAL = 60  # Seconds between scans of the hottest pairs
+SCAN_MAX_INTERVAL = 900  # Seconds between scans of the coldest pairs
+SCAN_REQUEST_BUDGET = 300  # REST requests per minute the scanner may spend
+SCAN_BATCH_SIZE = 10  # Due pairs fetched concurrently and scored together per batch
+SCAN_REPORT_INTERVAL = 300  # Seconds between scan interval / latency reports
+SCAN_PRIORITY_WEIGHTS = {
+    'volatility': 0.4,  # Recent 1m return volatility, ranked across the universe
+    'volume': 0.2,      # Recent quote volume, ranked across the universe
+    'proximity': 0.4,   # Last buy confidence relative to BUY_CONFIDENCE_THRESHOLD
+}
 BUY_CONFIDENCE_THRESHOLD = 0.55
 SELL_CONFIDENCE_THRESHOLD = 0.6
 
@@ -106,6 +179,28 @@ INDICATOR_WEIGHTS = {
 }
 
 
+# Paper trading: one shared data and indicator pipeline feeds every strategy below,
+# each with simulated fills at the book's best bid/ask and its own PnL book
+PAPER_TRADING = False  # When enabled, no real orders are placed
+PAPER_STARTING_BALANCE = 1000.0  # USDT per strategy book
+PAPER_FEE_RATE = 0.001  # Taker fee charged on each simulated fill
+PAPER_MAX_POSITIONS = 1  # Open positions per strategy; cash is split evenly across free slots
+PAPER_STRATEGIES = {
+    'default': {
+        'timeframes': TIMEFRAMES,
+        'timeframe_weights': TIMEFRAME_WEIGHTS,
+        'buy_threshold': BUY_CONFIDENCE_THRESHOLD,
+        'sell_threshold': SELL_CONFIDENCE_THRESHOLD,
+    },
+    'intraday': {
+        'timeframes': list(TIMEFRAME_WEIGHTS_FALSE),
+        'timeframe_weights': TIMEFRAME_WEIGHTS_FALSE,
+        'buy_threshold': BUY_CONFIDENCE_THRESHOLD,
+        'sell_threshold': SELL_CONFIDENCE_THRESHOLD,
+    },
+}
+
+
 DESIRED_COINS = [
     # Meme and Speculative Coins (High Volatility)
     "DOGE/USDT",   # Dogecoin - Meme coin with large price swings
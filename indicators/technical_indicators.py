@@ -1,3 +1,4 @@
+import pandas as pd
 import talib
 
 def calculate_indicators(df):
@@ -17,3 +18,14 @@ def calculate_indicators(df):
     df['atr_shift'] = df['atr'].shift(1)
     df['obv_shift'] = df['obv'].shift(1)
     return df
+
+def build_indicator_frame(ohlcv):
+    """
+    Build an indicator DataFrame from raw OHLCV rows (a module-level function so it can
+    run on a worker process).
+    """
+    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('timestamp', inplace=True)
+    df = df.ffill().bfill()
+    return calculate_indicators(df)
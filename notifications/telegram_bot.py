@@ -1,12 +1,59 @@
+import asyncio
 import logging
+import aiohttp
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import NetworkError, TelegramError, TimedOut
+from telegram.request import BaseRequest
 from config import settings  # Import the initialized `settings` object
+from network.transport import http_transport
 
 logger = logging.getLogger(__name__)
 
+
+class SharedTransportRequest(BaseRequest):
+    """
+    python-telegram-bot request backend that sends through the shared HTTP transport.
+    """
+
+    async def initialize(self):
+        await http_transport.get_session()
+
+    async def shutdown(self):
+        pass  # The shared transport is closed by its owner
+
+    async def do_request(self, url, method, request_data=None, read_timeout=BaseRequest.DEFAULT_NONE,
+                         write_timeout=BaseRequest.DEFAULT_NONE, connect_timeout=BaseRequest.DEFAULT_NONE,
+                         pool_timeout=BaseRequest.DEFAULT_NONE):
+        session = await http_transport.get_session()
+        timeout = aiohttp.ClientTimeout(
+            total=settings.HTTP_TIMEOUT,
+            connect=connect_timeout if isinstance(connect_timeout, (int, float)) else settings.HTTP_CONNECT_TIMEOUT,
+            sock_read=read_timeout if isinstance(read_timeout, (int, float)) else None,
+        )
+
+        data = None
+        if request_data is not None:
+            if request_data.contains_files:
+                data = aiohttp.FormData()
+                for name, value in request_data.json_parameters.items():
+                    data.add_field(name, value)
+                for name, (filename, content, content_type) in request_data.multipart_data.items():
+                    data.add_field(name, content, filename=filename, content_type=content_type)
+            else:
+                data = request_data.json_parameters
+
+        try:
+            async with session.request(method, url, data=data, timeout=timeout,
+                                       headers={'User-Agent': self.USER_AGENT}) as response:
+                return response.status, await response.read()
+        except asyncio.TimeoutError as err:
+            raise TimedOut from err
+        except aiohttp.ClientError as err:
+            raise NetworkError(f"aiohttp.{err.__class__.__name__}: {err}") from err
+
+
 # Initialize the bot with the token from settings
-bot = Bot(token=settings.TELEGRAM_TOKEN)
+bot = Bot(token=settings.TELEGRAM_TOKEN, request=SharedTransportRequest())
 
 async def send_telegram_message(message):
     """
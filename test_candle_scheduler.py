@@ -0,0 +1,46 @@
+from trading.candle_scheduler import CandleCloseScheduler
+
+BOUNDARY = 1_699_999_200  # Aligned to a 15m bar boundary
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_evaluates_only_after_a_relevant_candle_closes():
+    clock = FakeClock(BOUNDARY + 10)  # 10s after a 15m boundary
+    scheduler = CandleCloseScheduler(grace_seconds=2, clock=clock)
+
+    assert scheduler.should_evaluate('signal', 'DOGE/USDT', ['1m', '5m'])
+    clock.now += 30
+    assert not scheduler.should_evaluate('signal', 'DOGE/USDT', ['1m', '5m'])
+    assert scheduler.should_evaluate('signal', 'SOL/USDT', ['1m', '5m'])
+
+    clock.now += 30  # Next 1m boundary has passed and settled
+    assert scheduler.should_evaluate('signal', 'DOGE/USDT', ['1m', '5m'])
+    assert scheduler.counters['signal'] == {'evaluated': 3, 'skipped': 1}
+
+    # Detection latency is measured from the first bar the pair had not been evaluated on
+    assert scheduler.first_unevaluated_close('signal', 'SOL/USDT', '1m') is None
+    clock.now += 150  # Two more 1m bars closed without an evaluation
+    assert scheduler.should_evaluate('signal', 'DOGE/USDT', ['1m', '5m'])
+    assert scheduler.first_unevaluated_close('signal', 'DOGE/USDT', '1m') == (BOUNDARY + 120) * 1000
+    assert scheduler.latest_close('1m') == (BOUNDARY + 180) * 1000
+
+
+def test_grace_period_and_invalidate():
+    clock = FakeClock(BOUNDARY + 1)  # Boundary passed 1s ago, still inside the grace period
+    scheduler = CandleCloseScheduler(grace_seconds=2, clock=clock)
+    scheduler.should_evaluate('score', 'DOGE/USDT', ['1m'])
+    assert not scheduler.should_evaluate('score', 'DOGE/USDT', ['1m'])
+    assert scheduler.seconds_until_next_close(['1m']) == 1
+
+    clock.now += 1
+    assert scheduler.should_evaluate('score', 'DOGE/USDT', ['1m'])
+
+    scheduler.invalidate('score', 'DOGE/USDT')
+    assert scheduler.should_evaluate('score', 'DOGE/USDT', ['1m'])
@@ -0,0 +1,139 @@
+import asyncio
+import math
+import ccxt.async_support as ccxt
+import pytest
+from trading.execution import OrderExecutor
+
+
+class FakeExchange:
+    """Exchange stand-in with Binance-like lot size / notional filters and client order IDs."""
+
+    def __init__(self, fail_after_accept=0, fail_before_accept=0):
+        self.markets = {'DOGE/USDT': {'limits': {'amount': {'min': 1.0, 'max': 1e7}, 'cost': {'min': 5.0}}}}
+        self.orders = {}
+        self.submissions = 0
+        self.fail_after_accept = fail_after_accept
+        self.fail_before_accept = fail_before_accept
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def market(self, pair):
+        return self.markets[pair]
+
+    def amount_to_precision(self, pair, amount):
+        return str(math.floor(amount))  # Step size 1, truncated like ccxt
+
+    def cost_to_precision(self, pair, cost):
+        return f"{math.floor(cost * 100) / 100:.2f}"
+
+    async def load_markets(self):
+        return self.markets
+
+    def _accept(self, pair, side, amount, params):
+        self.submissions += 1
+        if self.fail_before_accept:
+            self.fail_before_accept -= 1
+            raise ccxt.RequestTimeout("timed out before reaching the matching engine")
+        order = {'id': str(len(self.orders) + 1), 'clientOrderId': params['newClientOrderId'], 'symbol': pair,
+                 'side': side, 'status': 'closed', 'filled': amount, 'average': 0.1,
+                 'fee': {'currency': 'DOGE', 'cost': amount * 0.001} if side == 'buy' else None}
+        self.orders[order['clientOrderId']] = order
+        if self.fail_after_accept:
+            self.fail_after_accept -= 1
+            raise ccxt.RequestTimeout("response lost")
+        return order
+
+    async def create_order(self, pair, order_type, side, amount, price=None, params=None):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        return self._accept(pair, side, amount, params)
+
+    async def create_market_buy_order_with_cost(self, pair, cost, params=None):
+        return self._accept(pair, 'buy', cost / 0.1, params)
+
+    async def fetch_order(self, order_id, pair, params=None):
+        client_order_id = (params or {}).get('origClientOrderId')
+        if client_order_id not in self.orders:
+            raise ccxt.OrderNotFound(client_order_id)
+        return self.orders[client_order_id]
+
+
+def test_orders_are_rounded_and_rejected_locally():
+    exchange = FakeExchange()
+    executor = OrderExecutor(exchange)
+    assert executor.prepare_amount('DOGE/USDT', 123.9, price=0.1) == (123.0, None)
+    assert executor.prepare_amount('DOGE/USDT', 0.7)[0] is None
+    assert executor.prepare_amount('DOGE/USDT', 40, price=0.1)[0] is None  # 4 USDT < 5 USDT min notional
+    assert asyncio.run(executor.buy('DOGE/USDT', 4.999)) is None
+    assert exchange.submissions == 0
+
+
+def test_lost_response_is_recovered_by_client_order_id():
+    exchange = FakeExchange(fail_after_accept=1)
+    executor = OrderExecutor(exchange, retry_backoff=0)
+    order = asyncio.run(executor.market_order('DOGE/USDT', 'sell', 100.5, price=0.1))
+    assert order['filled'] == 100 and exchange.submissions == 1
+    assert len(exchange.orders) == 1
+    assert len(executor.fill_latencies['sell']) == 1
+
+
+def test_unsent_order_is_retried_with_the_same_client_order_id():
+    exchange = FakeExchange(fail_before_accept=2)
+    executor = OrderExecutor(exchange, retry_backoff=0)
+    order = asyncio.run(executor.buy('DOGE/USDT', 10.009))
+    assert exchange.submissions == 3 and len(exchange.orders) == 1
+    assert order['filled'] == 100.0
+    assert executor.net_filled(order, 'DOGE/USDT') == 100.0 - 0.1
+
+
+def test_exits_are_submitted_concurrently():
+    exchange = FakeExchange()
+    exchange.markets['SOL/USDT'] = exchange.markets['DOGE/USDT']
+    executor = OrderExecutor(exchange)
+
+    results = asyncio.run(executor.close_positions([('DOGE/USDT', 100, 0.1), ('SOL/USDT', 200, 0.1)] * 5))
+    assert [order['filled'] for order in results] == [100, 200] * 5
+    assert exchange.peak_in_flight == 10  # All submissions overlap instead of running back to back
+
+
+def test_fill_polling_survives_network_errors():
+    exchange = FakeExchange()
+    accepted = exchange._accept
+
+    def accept_open(pair, side, amount, params):
+        order = accepted(pair, side, amount, params)
+        exchange.orders[order['clientOrderId']] = dict(order)
+        return dict(order, status='open', filled=0)
+
+    lookups = []
+    found = exchange.fetch_order
+
+    async def flaky_fetch_order(order_id, pair, params=None):
+        lookups.append(order_id)
+        if len(lookups) <= 2:
+            raise ccxt.NetworkError("connection reset")
+        return await found(order_id, pair, params)
+
+    exchange._accept = accept_open
+    exchange.fetch_order = flaky_fetch_order
+    executor = OrderExecutor(exchange, retry_backoff=0, fill_timeout=5)
+    order = asyncio.run(executor.market_order('DOGE/USDT', 'sell', 100, price=0.1))
+    assert order['status'] == 'closed' and order['filled'] == 100
+    assert len(lookups) == 3 and exchange.submissions == 1
+
+
+def test_lookup_failure_after_a_lost_submission_never_resubmits():
+    exchange = FakeExchange(fail_after_accept=1)
+
+    async def unreachable(order_id, pair, params=None):
+        raise ccxt.NetworkError("exchange unreachable")
+
+    exchange.fetch_order = unreachable
+    executor = OrderExecutor(exchange, retry_backoff=0)
+    with pytest.raises(ccxt.NetworkError):
+        asyncio.run(executor.buy('DOGE/USDT', 10))
+    assert exchange.submissions == 1
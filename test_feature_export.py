@@ -0,0 +1,66 @@
+import asyncio
+import math
+import numpy as np
+import pandas as pd
+from ML.feature_export import aligned_features, export_features, indicator_frame
+from ML.features import frame_features
+from trading.market_data import timeframe_to_ms
+
+START = 1_735_689_600_000  # 2025-01-01 00:00 UTC
+NOW = START + 2000 * 60_000 + 30_000  # Mid-way through a 1m bar
+
+
+class FakeHistoryExchange:
+    """Deterministic candle history for any timeframe, closed bars up to NOW."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def milliseconds(self):
+        return NOW
+
+    async def fetch_ohlcv(self, pair, timeframe, since=None, limit=1000):
+        self.requests += 1
+        step = timeframe_to_ms(timeframe)
+        first = -(-since // step) * step
+        rows = []
+        for ts in range(first, min(first + limit * step, NOW + 1), step):
+            close = 100 + 5 * math.sin(ts / 7e6) + 2 * math.cos(ts / 1.3e6) + (ts // step * 2654435761 % 1000) / 1000
+            rows.append([ts, close - 0.2, close + 0.5, close - 0.5, close, 1000 + (ts // step) % 37])
+        return rows
+
+
+def test_chunked_export_matches_single_pass_without_lookahead(tmp_path):
+    exchange = FakeHistoryExchange()
+    since, until = START + 1200 * 60_000, NOW
+    options = dict(timeframes=['1m', '5m', '15m'], warmup_bars=1000, file_format='parquet')
+
+    asyncio.run(export_features(['DOGE/USDT'], since, until, str(tmp_path / 'chunked'), exchange=exchange,
+                                chunk_bars=150, **options))
+    asyncio.run(export_features(['DOGE/USDT'], since, until, str(tmp_path / 'single'), exchange=exchange,
+                                chunk_bars=10_000, **options))
+
+    chunked = pd.concat(pd.read_parquet(path) for path in sorted((tmp_path / 'chunked' / 'DOGE_USDT').iterdir()))
+    single = pd.read_parquet(next((tmp_path / 'single' / 'DOGE_USDT').iterdir()))
+    assert len(list((tmp_path / 'chunked' / 'DOGE_USDT').iterdir())) == 6
+    assert len(chunked) == len(single) == 800  # Bars 1200..1999; the still-open bar at NOW is not exported
+    feature_columns = [column for column in single.columns if column not in ('timestamp', 'close_time')]
+    assert np.allclose(chunked[feature_columns].to_numpy(), single[feature_columns].to_numpy(), equal_nan=True)
+
+    # Every 15m feature comes from the latest 15m bar that had closed by the base bar's close
+    rows = asyncio.run(exchange.fetch_ohlcv('DOGE/USDT', '15m', since=since - 1000 * 15 * 60_000, limit=2000))
+    expected = frame_features(indicator_frame(rows, 1000))
+    for _, row in single.iloc[::97].iterrows():
+        closed = expected[expected.index + pd.Timedelta(minutes=15) <= row['close_time']]
+        assert np.isclose(row['15m_rsi'], closed['rsi'].iloc[-1])
+
+
+def test_alignment_drops_unclosed_higher_bars():
+    exchange = FakeHistoryExchange()
+    frames = {timeframe: asyncio.run(exchange.fetch_ohlcv('X/USDT', timeframe, since=START, limit=1000))
+              for timeframe in ('1m', '5m')}
+    df = aligned_features(frames, ['1m', '5m'], START + 300 * 60_000, NOW, NOW, 1000)
+    # A base bar closing mid-way through a 5m bar must use the previous 5m bar
+    row = df[df['close_time'] == pd.Timestamp(START + 303 * 60_000, unit='ms')].iloc[0]
+    five = frame_features(indicator_frame(frames['5m'], 1000))
+    assert np.isclose(row['5m_rsi'], five.loc[pd.Timestamp(START + 295 * 60_000, unit='ms'), 'rsi'])
@@ -0,0 +1,198 @@
+import asyncio
+import time
+from aiohttp import web, WSMsgType
+from aiohttp.test_utils import TestServer
+from trading.market_data import MarketDataFeed, timeframe_to_ms
+
+MINUTE = 60 * 1000
+
+
+class StandInBinanceServer:
+    """Local websocket stand-in for the Binance combined stream endpoint."""
+
+    def __init__(self):
+        self.sockets = {}
+        self.requests = []
+        app = web.Application()
+        app.router.add_get('/stream', self.handle)
+        self.server = TestServer(app)
+
+    async def start(self):
+        await self.server.start_server()
+        return str(self.server.make_url('/stream'))
+
+    async def close(self):
+        await self.drop()
+        await self.server.close()
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets[ws] = set()
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            payload = msg.json()
+            self.requests.append(payload)
+            if payload['method'] == 'SUBSCRIBE':
+                self.sockets[ws].update(payload['params'])
+            elif payload['method'] == 'UNSUBSCRIBE':
+                self.sockets[ws].difference_update(payload['params'])
+            await ws.send_json({'result': None, 'id': payload['id']})
+        del self.sockets[ws]
+        return ws
+
+    @property
+    def subscriptions(self):
+        return set().union(*self.sockets.values())
+
+    async def push(self, stream, data):
+        for ws in list(self.sockets):
+            await ws.send_json({'stream': stream, 'data': data})
+
+    async def drop(self):
+        for ws in list(self.sockets):
+            await ws.close()
+
+
+class FakeExchange:
+    """REST stand-in returning contiguous synthetic candles up to the current minute."""
+
+    def __init__(self):
+        self.ohlcv_calls = []
+
+    async def fetch_ohlcv(self, pair, timeframe, since=None, limit=None):
+        self.ohlcv_calls.append((pair, timeframe, since, limit))
+        step = timeframe_to_ms(timeframe)
+        now = int(time.time() * 1000) // step * step
+        start = since if since is not None else now - (limit - 1) * step
+        return [[ts, 1.0, 2.0, 0.5, 1.5, 10.0] for ts in range(start, now + 1, step)][:limit]
+
+    async def fetch_order_book(self, pair):
+        return {'symbol': pair, 'bids': [[1.0, 1.0]], 'asks': [[1.1, 1.0]], 'rest': True}
+
+    async def fetch_ticker(self, pair):
+        return {'symbol': pair, 'last': 1.0, 'rest': True}
+
+
+def kline(timestamp, close, timeframe='1m'):
+    return {'e': 'kline', 's': 'DOGEUSDT', 'k': {
+        't': timestamp, 'i': timeframe, 'o': '1.0', 'h': '2.0', 'l': '0.5', 'c': str(close), 'v': '5.0', 'x': False,
+    }}
+
+
+async def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met before timeout")
+        await asyncio.sleep(0.01)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_feed(url, exchange):
+    feed = MarketDataFeed(exchange, timeframes=['1m'], base_url=url, candle_limit=50, stale_after=5)
+    feed.reconnect_delay = 0.05
+    return feed
+
+
+def test_streams_update_cached_candles_books_and_trades():
+    async def scenario():
+        server = StandInBinanceServer()
+        exchange = FakeExchange()
+        feed = make_feed(await server.start(), exchange)
+        try:
+            await feed.start(['DOGE/USDT'])
+            await wait_for(lambda: 'dogeusdt@kline_1m' in server.subscriptions)
+            assert server.subscriptions == {'dogeusdt@kline_1m', 'dogeusdt@depth20@100ms', 'dogeusdt@trade'}
+
+            # First read seeds the cache via REST, later reads are served from the stream
+            seeded = await feed.fetch_ohlcv('DOGE/USDT', '1m', 50)
+            assert len(seeded) == 50 and len(exchange.ohlcv_calls) == 1
+            await server.push('dogeusdt@kline_1m', kline(seeded[-1][0], 3.25))
+            await wait_for(lambda: feed.candles[('DOGE/USDT', '1m')][-1][4] == 3.25)
+            streamed = await feed.fetch_ohlcv('DOGE/USDT', '1m', 50)
+            assert streamed[-1][4] == 3.25 and len(exchange.ohlcv_calls) == 1
+
+            assert (await feed.fetch_order_book('DOGE/USDT')).get('rest')
+            await server.push('dogeusdt@depth20@100ms', {'lastUpdateId': 1, 'bids': [['0.99', '4']], 'asks': [['1.01', '2']]})
+            await wait_for(lambda: feed.get_order_book('DOGE/USDT') is not None)
+            book = await feed.fetch_order_book('DOGE/USDT')
+            assert book['bids'] == [[0.99, 4.0]] and book['asks'] == [[1.01, 2.0]]
+
+            await server.push('dogeusdt@trade', {'e': 'trade', 'p': '1.02', 'q': '3', 'T': 1, 'm': False})
+            await wait_for(lambda: feed.get_last_price('DOGE/USDT') == 1.02)
+            assert (await feed.fetch_ticker('DOGE/USDT'))['last'] == 1.02
+
+            # Streams that stop delivering messages fall back to REST
+            for stream in ('dogeusdt@trade', 'dogeusdt@kline_1m'):
+                feed._received[stream] -= 6
+            assert feed.get_last_price('DOGE/USDT') is None
+            assert (await feed.fetch_ticker('DOGE/USDT')).get('rest')
+            await feed.fetch_ohlcv('DOGE/USDT', '1m', 50)
+            assert len(exchange.ohlcv_calls) == 2
+        finally:
+            await feed.stop()
+            await server.close()
+
+    run(scenario())
+
+
+def test_reconnect_resubscribes_and_backfills_gap():
+    async def scenario():
+        server = StandInBinanceServer()
+        exchange = FakeExchange()
+        feed = make_feed(await server.start(), exchange)
+        try:
+            await feed.start(['DOGE/USDT'])
+            await wait_for(lambda: server.sockets)
+            await feed.fetch_ohlcv('DOGE/USDT', '1m', 50)
+            key = ('DOGE/USDT', '1m')
+            # Simulate candles missed while disconnected
+            del feed.candles[key][-5:]
+            last_cached = feed.candles[key][-1][0]
+
+            await server.drop()
+            await wait_for(lambda: feed.stats['reconnects'] >= 1 and 'dogeusdt@kline_1m' in server.subscriptions)
+            await wait_for(lambda: 'dogeusdt@kline_1m' in feed._synced)
+            assert exchange.ohlcv_calls[-1][2] == last_cached
+            assert len(feed.candles[key]) == 50
+
+            # A gap inside the live stream is also backfilled through REST
+            calls = len(exchange.ohlcv_calls)
+            newest = feed.candles[key][-1][0]
+            del feed.candles[key][-3:]
+            await server.push('dogeusdt@kline_1m', kline(newest, 4.0))
+            await wait_for(lambda: len(exchange.ohlcv_calls) > calls and 'dogeusdt@kline_1m' in feed._synced)
+            timestamps = [row[0] for row in feed.candles[key]]
+            assert all(b - a == MINUTE for a, b in zip(timestamps, timestamps[1:]))
+        finally:
+            await feed.stop()
+            await server.close()
+
+    run(scenario())
+
+
+def test_universe_churn_updates_subscriptions():
+    async def scenario():
+        server = StandInBinanceServer()
+        feed = make_feed(await server.start(), FakeExchange())
+        feed.max_streams_per_connection = 3
+        try:
+            await feed.start(['DOGE/USDT', 'SOL/USDT'])
+            await wait_for(lambda: len(server.subscriptions) == 6)
+            assert len(feed._connections) == 2
+            await feed.fetch_ohlcv('DOGE/USDT', '1m', 10)
+
+            await feed.set_universe(['SOL/USDT', 'PEPE/USDT'])
+            await wait_for(lambda: server.subscriptions == set(feed.streams_for('SOL/USDT') + feed.streams_for('PEPE/USDT')))
+            assert ('DOGE/USDT', '1m') not in feed.candles
+            assert len(feed._connections) == 2
+        finally:
+            await feed.stop()
+            await server.close()
+
+    run(scenario())
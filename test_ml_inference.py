@@ -0,0 +1,59 @@
+import asyncio
+import pickle
+import numpy as np
+import pandas as pd
+from indicators.technical_indicators import calculate_indicators
+from ML.features import FEATURE_COLUMNS
+from ML.inference import LocalModelInference
+
+
+class CountingModel:
+    """Picklable stand-in model: probability from the 1m RSI feature, counting batched calls."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_proba(self, matrix):
+        self.batch_sizes.append(len(matrix))
+        up = np.clip(matrix[:, FEATURE_COLUMNS.index('rsi')] / 100, 0, 1)
+        return np.column_stack([1 - up, up])
+
+
+def indicator_frames(seed, rows=200, timeframes=('1m', '5m')):
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for timeframe in timeframes:
+        close = 100 + rng.standard_normal(rows).cumsum()
+        df = pd.DataFrame({
+            'open': close + rng.uniform(-0.5, 0.5, rows),
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': rng.uniform(1000, 5000, rows),
+        }, index=pd.date_range('2025-01-01', periods=rows, freq='min'))
+        frames[timeframe] = calculate_indicators(df)
+    return frames
+
+
+def test_pairs_are_scored_in_one_batch_and_cached_per_bar(tmp_path):
+    model_path = tmp_path / 'ml_model.pkl'
+    model_path.write_bytes(pickle.dumps(CountingModel()))
+    inference = LocalModelInference(model_path=str(model_path), timeframes=['1m', '5m'])
+
+    frames = {pair: indicator_frames(seed) for seed, pair in enumerate(['DOGE/USDT', 'SOL/USDT', 'PEPE/USDT'])}
+    for pair, data in frames.items():
+        inference.observe(pair, data)
+
+    assert asyncio.run(inference.predict_pending()) == 3
+    assert inference._model.batch_sizes == [3]
+    expected = frames['SOL/USDT']['1m']['rsi'].iloc[-2] / 100
+    assert abs(inference.prediction('SOL/USDT') - expected) < 1e-9
+
+    # Same bars again: served from the cache without another model call
+    assert asyncio.run(inference.predict('SOL/USDT', frames['SOL/USDT'])) == inference.prediction('SOL/USDT')
+    assert inference._model.batch_sizes == [3]
+
+
+def test_missing_model_disables_predictions(tmp_path):
+    inference = LocalModelInference(model_path=str(tmp_path / 'missing.pkl'), timeframes=['1m', '5m'])
+    assert asyncio.run(inference.predict('DOGE/USDT', indicator_frames(0))) is None
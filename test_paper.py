@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import trading.paper as paper
+from indicators.technical_indicators import calculate_indicators
+from trading.paper import PaperTradingEngine
+
+ORDER_BOOK = {'bids': [[99.0, 5.0], [98.0, 5.0]], 'asks': [[101.0, 5.0], [102.0, 5.0]]}
+
+
+def indicator_frames(timeframes, rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for timeframe in timeframes:
+        close = 100 + rng.standard_normal(rows).cumsum()
+        df = pd.DataFrame({
+            'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+            'volume': rng.uniform(1000, 5000, rows),
+        }, index=pd.date_range('2025-01-01', periods=rows, freq='min'))
+        frames[timeframe] = calculate_indicators(df)
+    return frames
+
+
+def engine():
+    return PaperTradingEngine(strategies={
+        'eager': {'timeframes': ['1m', '5m'], 'timeframe_weights': {'1m': 1.0, '5m': 1.0}, 'buy_threshold': 0.0},
+        'never': {'timeframes': ['5m', '15m'], 'timeframe_weights': {'5m': 1.0, '15m': 2.0}, 'buy_threshold': 2.0},
+    }, starting_balance=1000.0, fee_rate=0.001, max_positions=1)
+
+
+def test_strategies_share_one_evaluation_and_fill_at_the_ask(monkeypatch):
+    calls = []
+    shared = paper.timeframe_confidences
+    monkeypatch.setattr(paper, 'timeframe_confidences', lambda data, timeframes: calls.append(timeframes) or shared(data, timeframes))
+
+    trading_engine = engine()
+    assert trading_engine.timeframes == ['1m', '5m', '15m']
+    results = trading_engine.evaluate('DOGE/USDT', indicator_frames(trading_engine.feed_timeframes), ORDER_BOOK)
+
+    assert calls == [['1m', '5m', '15m']]  # Conditions evaluated once for both strategies
+    assert results['eager']['signal'] == "buy" and results['never']['signal'] != "buy"
+    position = trading_engine.books['eager'].positions['DOGE/USDT']
+    assert position['entry_price'] == 101.0
+    assert abs(position['amount'] - 999.0 / 101.0) < 1e-9
+    assert trading_engine.books['eager'].cash == 0
+    assert not trading_engine.books['never'].positions
+
+
+def test_exits_fill_at_the_bid_and_update_the_book():
+    trading_engine = engine()
+    book = trading_engine.books['eager']
+    book.open('DOGE/USDT', 100.0, take_profit_percentage=0.05, stop_loss_percentage=0.02)
+
+    assert trading_engine.check_exits('DOGE/USDT', 103.0, ORDER_BOOK) == []
+    trade, = trading_engine.check_exits('DOGE/USDT', 105.5, {'bids': [[105.0, 1.0]], 'asks': [[106.0, 1.0]]})
+    assert trade['reason'] == 'Take-Profit' and trade['exit_price'] == 105.0
+
+    proceeds = 999.0 / 100.0 * 105.0 * 0.999
+    assert abs(book.cash - proceeds) < 1e-9
+    summary = trading_engine.summaries()['eager']
+    assert abs(summary['pnl'] - (proceeds - 1000.0)) < 1e-9
+    assert summary['trades'] == 1 and summary['win_rate'] == 1.0 and summary['open_positions'] == 0
@@ -0,0 +1,89 @@
+import numpy as np
+from trading.portfolio import RollingCovariance, PortfolioAllocator, allocate, benchmark
+
+FIVE_MINUTES = 300_000
+
+
+def test_incremental_covariance_matches_recompute_over_the_window():
+    rng = np.random.default_rng(1)
+    returns = rng.standard_normal((130, 20)) * 0.01
+    pairs = [f"P{i}/USDT" for i in range(20)]
+    rolling = RollingCovariance(pairs, window=50, resync_interval=10 ** 9)
+    for row in returns:
+        rolling.update(row)
+    assert np.allclose(rolling.covariance(), np.cov(returns[-50:], rowvar=False), atol=1e-12)
+    assert np.allclose(rolling.covariance(pairs[3:6]), np.cov(returns[-50:, 3:6], rowvar=False), atol=1e-12)
+
+    # Dropping and adding pairs keeps the history of the pairs that stay
+    rolling.set_universe(pairs[5:] + ['NEW/USDT'])
+    assert np.allclose(rolling.covariance(pairs[5:]), np.cov(returns[-50:, 5:], rowvar=False), atol=1e-12)
+    assert rolling.observations[rolling.index['NEW/USDT']] == 0
+
+
+def test_candle_caches_feed_the_covariance_including_late_pairs():
+    rng = np.random.default_rng(2)
+    bars = 80
+    closes = {pair: 100 * np.exp(np.cumsum(rng.standard_normal(bars) * 0.01)) for pair in ['A/USDT', 'B/USDT', 'C/USDT']}
+    start = 1_700_000_100_000 // FIVE_MINUTES * FIVE_MINUTES
+    candles = {(pair, '5m'): [[start + i * FIVE_MINUTES, 0, 0, 0, close, 0] for i, close in enumerate(series)]
+               for pair, series in closes.items()}
+
+    portfolio = PortfolioAllocator(list(closes), timeframe='5m', window=30)
+    late = candles.pop(('C/USDT', '5m'))
+    assert portfolio.update_from_candles(candles, start + 60 * FIVE_MINUTES) == 30
+    candles[('C/USDT', '5m')] = late
+    assert portfolio.update_from_candles(candles, start + 79 * FIVE_MINUTES) == 19
+
+    log_returns = np.diff(np.log(np.column_stack([closes[pair] for pair in closes])), axis=0)
+    assert np.allclose(portfolio.covariance.covariance(), np.cov(log_returns[-30:], rowvar=False), atol=1e-12)
+    assert list(portfolio.covariance.observations) == [30, 30, 30]
+
+
+def test_lagging_cache_holds_the_update_until_its_bar_arrives():
+    rng = np.random.default_rng(4)
+    bars = 60
+    closes = {pair: 100 * np.exp(np.cumsum(rng.standard_normal(bars) * 0.01)) for pair in ['A/USDT', 'B/USDT']}
+    start = 1_700_000_100_000 // FIVE_MINUTES * FIVE_MINUTES
+    candles = {(pair, '5m'): [[start + i * FIVE_MINUTES, 0, 0, 0, close, 0] for i, close in enumerate(series)]
+               for pair, series in closes.items()}
+
+    portfolio = PortfolioAllocator(list(closes), timeframe='5m', window=30)
+    assert portfolio.update_from_candles(candles, start + 50 * FIVE_MINUTES) == 30
+    late_rows = candles[('B/USDT', '5m')][52:]
+    del candles[('B/USDT', '5m')][52:]
+    assert portfolio.update_from_candles(candles, start + 53 * FIVE_MINUTES) == 1  # Only bar 51, which B has
+    candles[('B/USDT', '5m')] += late_rows
+    assert portfolio.update_from_candles(candles, start + 53 * FIVE_MINUTES) == 2
+
+    log_returns = np.diff(np.log(np.column_stack([closes[pair] for pair in closes])), axis=0)
+    assert list(portfolio.covariance.observations) == [30, 30]
+    assert np.allclose(portfolio.covariance.covariance(), np.cov(log_returns[23:53], rowvar=False), atol=1e-12)
+
+    # A close that never arrives leaves two unobserved bars instead of one return spanning both
+    rolling = portfolio.covariance
+    rolling.update_closes({'A/USDT': 1.0, 'B/USDT': 1.0})
+    rolling.update_closes({'A/USDT': 1.1})
+    rolling.update_closes({'A/USDT': 1.2, 'B/USDT': 2.0})
+    assert not rolling.observed[(rolling.position - 1) % rolling.window, rolling.index['B/USDT']]
+
+
+def test_correlated_signals_share_an_allocation():
+    rng = np.random.default_rng(3)
+    common = rng.standard_normal(300)
+    returns = np.column_stack([common + 0.1 * rng.standard_normal(300),
+                               common + 0.1 * rng.standard_normal(300),
+                               rng.standard_normal(300)]) * 0.01
+    confidences = {'DOGE/USDT': 0.6, 'SHIB/USDT': 0.6, 'SOL/USDT': 0.6}
+    weights = allocate(confidences, np.cov(returns, rowvar=False), observations=np.array([300, 300, 300]))
+
+    assert abs(sum(weights.values()) - 1) < 1e-12
+    # The two near-identical meme coins split roughly what the independent pair gets alone
+    assert weights['SOL/USDT'] > 0.4 and max(weights['DOGE/USDT'], weights['SHIB/USDT']) < 0.3
+    assert allocate({'DOGE/USDT': 0.7}) == {'DOGE/USDT': 1.0}
+    without_history = allocate({'DOGE/USDT': 0.6, 'SOL/USDT': 0.9})
+    assert abs(without_history['DOGE/USDT'] - 0.4) < 1e-12 and abs(without_history['SOL/USDT'] - 0.6) < 1e-12
+
+
+def test_update_for_500_pairs_beats_full_recompute():
+    results = benchmark(n_pairs=500, window=288, bars=20)
+    assert results['incremental'] < results['recompute']
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import pstats
+import trading.runtime as runtime
+from config import settings
+from trading.runtime import LoopLagMonitor, SweepProfiler, run_cpu
+
+
+def blocking_callback():
+    time.sleep(0.4)
+
+
+def test_blocking_callback_stack_is_logged(caplog):
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.02, threshold=0.15)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        blocking_callback()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        return monitor
+
+    with caplog.at_level(logging.WARNING, logger='trading.runtime'):
+        monitor = asyncio.run(scenario())
+
+    assert monitor.stalls == 1
+    assert max(monitor.lags) > 0.3
+    assert 'blocking_callback' in caplog.text
+
+
+def test_cpu_stage_runs_off_the_loop_thread(monkeypatch):
+    monkeypatch.setattr(settings, 'CPU_EXECUTOR', 'thread')
+    runtime.shutdown_cpu_executor()
+    try:
+        loop_thread = threading.get_ident()
+        worker_thread = asyncio.run(run_cpu(threading.get_ident))
+        assert worker_thread != loop_thread
+    finally:
+        runtime.shutdown_cpu_executor()
+
+
+def offloaded_stage():
+    return sum(i * i for i in range(10000)), threading.get_ident()
+
+
+def test_flag_file_profiles_one_sweep_including_cpu_stages(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'CPU_EXECUTOR', 'thread')
+    runtime.shutdown_cpu_executor()
+    flag_file = tmp_path / 'profile_next_sweep'
+    profiler = SweepProfiler(profile_dir=str(tmp_path / 'profiles'), flag_file=str(flag_file))
+    try:
+        profiler.begin()
+        assert profiler.end() is None
+
+        flag_file.touch()
+        profiler.begin()
+        _, worker_thread = asyncio.run(run_cpu(offloaded_stage))
+        path = profiler.end()
+        assert worker_thread == threading.get_ident()  # Ran inline on the profiled thread
+        assert os.path.exists(path) and not flag_file.exists()
+        assert any(function == 'offloaded_stage' for _, _, function in pstats.Stats(path).stats)
+
+        # Outside a profiled sweep stages are offloaded again
+        assert asyncio.run(run_cpu(offloaded_stage))[1] != threading.get_ident()
+    finally:
+        runtime.shutdown_cpu_executor()
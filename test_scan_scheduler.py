@@ -0,0 +1,56 @@
+import asyncio
+from trading.scan_scheduler import ScanScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hot_pairs_get_shorter_intervals():
+    clock = FakeClock()
+    scheduler = ScanScheduler(['DOGE/USDT', 'BTC/USDT', 'SOL/USDT'], min_interval=60, max_interval=960,
+                              request_budget=10_000, clock=clock)
+    scheduler.record('DOGE/USDT', volatility=0.02, volume=5e6, buy_confidence=0.5)
+    scheduler.record('BTC/USDT', volatility=0.001, volume=1e5, buy_confidence=0.0)
+    scheduler.record('SOL/USDT', volatility=0.01, volume=1e6, buy_confidence=0.2)
+
+    intervals = scheduler.intervals
+    assert intervals['DOGE/USDT'] < intervals['SOL/USDT'] < intervals['BTC/USDT']
+    assert 60 <= intervals['DOGE/USDT'] and intervals['BTC/USDT'] <= 960
+
+
+def test_request_budget_stretches_intervals_and_gates_scans():
+    clock = FakeClock()
+    pairs = [f"P{i}/USDT" for i in range(10)]
+    scheduler = ScanScheduler(pairs, min_interval=60, max_interval=600, request_budget=20,
+                              requests_per_scan=4, clock=clock)
+
+    async def scan(count):
+        for _ in range(count):
+            pair = await asyncio.wait_for(scheduler.next_pair(), timeout=0.05)
+            scheduler.record(pair, volatility=0.01, volume=1e6, buy_confidence=0.55, requests=4)
+
+    # Five scans spend the whole budget; the other five pairs are due but have to wait for a refill
+    asyncio.run(scan(5))
+    try:
+        asyncio.run(scan(1))
+        assert False, "scan should wait for the request budget to refill"
+    except asyncio.TimeoutError:
+        pass
+
+    planned = sum(4 * 60 / interval for interval in scheduler.intervals.values())
+    assert planned <= 20 + 1e-9
+
+
+def test_skipped_pair_keeps_its_slot():
+    clock = FakeClock()
+    scheduler = ScanScheduler(['DOGE/USDT'], min_interval=60, max_interval=600, clock=clock)
+    pair = asyncio.run(scheduler.next_pair())
+    scheduler.skip(pair, delay=5)
+    scheduler.skip(pair, delay=500)
+    clock.now += 5
+    assert asyncio.run(scheduler.next_pair()) == 'DOGE/USDT'
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from config import settings
+from trading.market_data import MarketDataFeed
+from trading.state import StateJournal, write_snapshot, load_snapshot
+
+MINUTE = 60_000
+
+
+def test_journal_replays_positions_and_unresolved_orders_after_a_crash(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = StateJournal(str(path))
+    journal.append('order_submitted', pair='DOGE/USDT', side='buy', client_order_id='autobc-b-1', amount=None, cost=50.0)
+    journal.append('order_filled', client_order_id='autobc-b-1', status='closed', filled=500.0, average=0.1)
+    journal.append('position_open', pair='DOGE/USDT', amount=499.5, buy_price=0.1, profit_percentage=0.05,
+                   take_profit_price=0.105, stop_loss_price=0.098, ratcheted_at_ms=None)
+    journal.append('position_update', pair='DOGE/USDT', profit_percentage=0.06, take_profit_price=0.106,
+                   ratcheted_at_ms=1_700_000_000_000)
+    journal.append('position_open', pair='SOL/USDT', amount=1.0, buy_price=20.0, profit_percentage=0.05,
+                   take_profit_price=21.0, stop_loss_price=19.6, ratcheted_at_ms=None)
+    journal.append('position_close', pair='SOL/USDT', price=21.0, reason='take_profit')
+    journal.append('order_submitted', pair='DOGE/USDT', side='sell', client_order_id='autobc-s-2', amount=499.0, cost=None)
+    journal.close()
+    with open(path, 'a') as journal_file:
+        journal_file.write('{"event": "position_upd')  # Torn final write
+
+    restored = StateJournal(str(path))
+    assert list(restored.positions) == ['DOGE/USDT']
+    assert restored.positions['DOGE/USDT']['take_profit_price'] == 0.106
+    assert restored.positions['DOGE/USDT']['amount'] == 499.5
+    assert list(restored.pending) == ['autobc-s-2']
+
+    restored.compact()
+    compacted = StateJournal(str(path))
+    assert compacted.positions == restored.positions and compacted.pending == restored.pending
+    assert len(path.read_text().splitlines()) == 2
+
+
+class RecordingExchange:
+    def __init__(self):
+        self.calls = []
+
+    async def fetch_ohlcv(self, pair, timeframe='1m', since=None, limit=None):
+        self.calls.append(since)
+        now = int(time.time() * 1000) // MINUTE * MINUTE
+        start = since if since is not None else now - (limit - 1) * MINUTE
+        return [[timestamp, 1.0, 1.0, 1.0, 1.0, 1.0] for timestamp in range(start, now + 1, MINUTE)]
+
+
+def test_snapshot_restore_backfills_only_missed_candles(tmp_path):
+    now = int(time.time() * 1000) // MINUTE * MINUTE
+    snapshot_rows = [[now - (100 - i) * MINUTE, 1.0, 1.0, 1.0, 1.0, 1.0] for i in range(95)]
+    write_snapshot(str(tmp_path / 'candles.pkl'), {('DOGE/USDT', '1m'): snapshot_rows, ('OLD/USDT', '1m'): snapshot_rows})
+
+    snapshot = load_snapshot(str(tmp_path / 'candles.pkl'), max_age=60)
+    exchange = RecordingExchange()
+    feed = MarketDataFeed(exchange, timeframes=['1m'], candle_limit=100)
+    assert feed.restore_candles(snapshot['candles'], pairs=['DOGE/USDT']) == 1
+
+    asyncio.run(feed._backfill(('DOGE/USDT', '1m')))
+    assert exchange.calls == [snapshot_rows[-1][0]]  # Only the bars since the snapshot were requested
+    candles = feed.candles[('DOGE/USDT', '1m')]
+    assert len(candles) == 100 and candles[-1][0] == now
+    assert load_snapshot(str(tmp_path / 'candles.pkl'), max_age=-1) is None
+
+
+def test_fills_open_and_close_the_positions_they_were_placed_for(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = StateJournal(str(path))
+    journal.append('order_submitted', pair='DOGE/USDT', side='buy', client_order_id='autobc-b-1', amount=None, cost=50.0,
+                   intent={'action': 'open', 'pair': 'DOGE/USDT', 'take_profit': 0.05, 'stop_loss': 0.02})
+    journal.append('order_filled', client_order_id='autobc-b-1', status='closed', filled=500.0, net_filled=499.5,
+                   average=0.1, cost=50.0)
+    journal.append('order_submitted', pair='SOL/USDT', side='buy', client_order_id='autobc-b-2', amount=None, cost=20.0,
+                   intent={'action': 'open', 'pair': 'SOL/USDT', 'take_profit': 0.05, 'stop_loss': 0.02})
+    journal.append('order_filled', client_order_id='autobc-b-2', status='closed', filled=1.0, net_filled=1.0,
+                   average=None, cost=20.0)
+    journal.append('order_submitted', pair='SOL/USDT', side='sell', client_order_id='autobc-s-3', amount=1.0, cost=None,
+                   intent={'action': 'close', 'pair': 'SOL/USDT', 'reason': 'take_profit'})
+    journal.append('order_filled', client_order_id='autobc-s-3', status='closed', filled=1.0, net_filled=1.0,
+                   average=21.0, cost=21.0)
+    journal.close()  # Crash before any position_open / position_close was written
+
+    restored = StateJournal(str(path))
+    assert list(restored.positions) == ['DOGE/USDT'] and not restored.pending
+    position = restored.positions['DOGE/USDT']
+    assert position['amount'] == 499.5 and position['buy_price'] == 0.1
+    assert abs(position['take_profit_price'] - 0.105) < 1e-12 and abs(position['stop_loss_price'] - 0.098) < 1e-12
+
+
+def test_snapshot_of_400_pairs_does_not_block_the_loop(tmp_path):
+    row_count = 1000
+    candles = {(f"P{i}/USDT", timeframe): [[i * MINUTE, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(row_count)]
+               for i in range(400) for timeframe in ('1m', '5m', '15m')}
+    path = str(tmp_path / 'candles.pkl')
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        lags = []
+        snapshot = loop.run_in_executor(None, write_snapshot, path, list(candles.items()))
+        while not snapshot.done():
+            expected = loop.time() + 0.005
+            await asyncio.sleep(0.005)
+            lags.append(loop.time() - expected)
+            candles[('P0/USDT', '1m')].append([row_count * MINUTE, 1.0, 2.0, 0.5, 1.5, 10.0])  # Live updates continue
+        await snapshot
+        return max(lags)
+
+    assert asyncio.run(scenario()) < settings.LOOP_BLOCK_THRESHOLD
+    restored = load_snapshot(path)['candles']
+    assert len(restored) == 1200 and restored[('P1/USDT', '5m')] == candles[('P1/USDT', '5m')]
+
+
+def test_partial_exit_keeps_the_rest_of_the_position(tmp_path):
+    journal = StateJournal(str(tmp_path / 'journal.jsonl'))
+    journal.append('position_open', pair='DOGE/USDT', amount=499.5, buy_price=0.1, profit_percentage=0.05,
+                   take_profit_price=0.105, stop_loss_price=0.098, ratcheted_at_ms=None)
+    close = {'action': 'close', 'pair': 'DOGE/USDT', 'reason': 'take_profit', 'min_amount': 1.0}
+    journal.append('order_submitted', pair='DOGE/USDT', side='sell', client_order_id='autobc-s-1', amount=499.0,
+                   cost=None, intent=close)
+    journal.append('order_filled', client_order_id='autobc-s-1', status='open', filled=200.0, net_filled=200.0,
+                   average=0.105, cost=21.0)
+    assert journal.positions['DOGE/USDT']['amount'] == 299.5
+
+    journal.append('order_submitted', pair='DOGE/USDT', side='sell', client_order_id='autobc-s-2', amount=299.0,
+                   cost=None, intent=close)
+    journal.append('order_filled', client_order_id='autobc-s-2', status='closed', filled=299.0, net_filled=299.0,
+                   average=0.105, cost=31.4)
+    assert 'DOGE/USDT' not in journal.positions  # The 0.5 left is below the lot minimum
+    journal.close()
@@ -43,6 +43,18 @@ def generate_mock_data(rows=100):
 # Generate mock data for all timeframes
 mock_data = {tf: generate_mock_data() for tf in TIMEFRAMES}
 
+
+def test_returned_confidences_are_the_blended_ones():
+    from config.settings import ML_BLEND_WEIGHT
+    from trading.strategy import evaluate_signal_confidence
+    order_book = {'bids': [[99.0, 5.0]], 'asks': [[101.0, 5.0]]}
+    plain = evaluate_signal_confidence(mock_data, order_book, timeframes=TIMEFRAMES, timeframe_weights=TIMEFRAME_WEIGHTS)
+    blended = evaluate_signal_confidence(mock_data, order_book, ml_probability=1.0, timeframes=TIMEFRAMES,
+                                         timeframe_weights=TIMEFRAME_WEIGHTS, buy_threshold=2.0)
+    assert abs(blended['buy_confidence'] - ((1 - ML_BLEND_WEIGHT) * plain['buy_confidence'] + ML_BLEND_WEIGHT)) < 1e-12
+    assert abs(blended['sell_confidence'] - (1 - ML_BLEND_WEIGHT) * plain['sell_confidence']) < 1e-12
+
+
 # Test strategy.py
 if __name__ == "__main__":
     signal = simplified_evaluate_trading_signals(mock_data)
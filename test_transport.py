@@ -0,0 +1,84 @@
+import asyncio
+import importlib
+import time
+import ccxt.async_support as ccxt
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from config import settings
+from network.transport import HttpTransport, endpoint_name
+from yarl import URL
+
+TOKEN = '123456:SECRET-token'
+
+
+class StandInApiServer:
+    """Local stand-in for the Telegram bot API and a Binance REST endpoint."""
+
+    def __init__(self):
+        self.messages = []
+        app = web.Application()
+        app.router.add_post('/bot{token}/sendMessage', self.send_message)
+        app.router.add_get('/api/v3/time', self.server_time)
+        self.server = TestServer(app)
+
+    async def start(self):
+        await self.server.start_server()
+        return str(self.server.make_url('')).rstrip('/')
+
+    async def send_message(self, request):
+        payload = dict(await request.post())  # Sent form-encoded, as the bot API accepts
+        self.messages.append((request.match_info['token'], payload))
+        return web.json_response({'ok': True, 'result': {
+            'message_id': len(self.messages), 'date': int(time.time()), 'text': payload['text'],
+            'chat': {'id': int(payload['chat_id']), 'type': 'private'},
+        }})
+
+    async def server_time(self, request):
+        return web.json_response({'serverTime': int(time.time() * 1000)})
+
+
+def test_endpoint_name_redacts_the_bot_token():
+    url = URL(f"https://api.telegram.org/bot{TOKEN}/sendMessage?chat_id=1")
+    assert endpoint_name('POST', url) == 'POST api.telegram.org/bot<token>/sendMessage'
+    assert 'SECRET' not in endpoint_name('POST', url)
+
+
+def test_bot_and_exchange_share_one_traced_pool(monkeypatch):
+    monkeypatch.setattr(settings, 'TELEGRAM_TOKEN', TOKEN)
+    telegram_bot = importlib.import_module('notifications.telegram_bot')
+    transport = HttpTransport()
+    monkeypatch.setattr(telegram_bot, 'http_transport', transport)
+
+    async def scenario():
+        server = StandInApiServer()
+        base_url = await server.start()
+        exchange = ccxt.binance()
+        try:
+            bot = telegram_bot.Bot(token=TOKEN, base_url=f"{base_url}/bot",
+                                   request=telegram_bot.SharedTransportRequest())
+            for i in range(3):
+                message = await bot.send_message(chat_id=42, text=f"ping {i}")
+                assert message.text == f"ping {i}"
+            assert [payload['text'] for _, payload in server.messages] == ['ping 0', 'ping 1', 'ping 2']
+            assert server.messages[0][0] == TOKEN
+
+            session = await transport.get_session()
+            transport.attach_exchange(exchange, session)
+            response = await exchange.fetch(f"{base_url}/api/v3/time", 'GET')
+            assert 'serverTime' in response
+            assert exchange.session is session
+        finally:
+            await exchange.close()
+            await transport.close()
+            await server.server.close()
+
+    asyncio.run(scenario())
+
+    stats = transport.endpoint_stats()
+    send = stats['POST 127.0.0.1/bot<token>/sendMessage']
+    assert send['requests'] == 3 and send['errors'] == 0
+    assert send['new'] == 1 and send['reused'] == 2
+    assert 0 < send['p50_ms'] <= send['p95_ms'] <= send['p99_ms'] <= send['max_ms']
+    # The exchange request went through the same keep-alive pool
+    assert stats['GET 127.0.0.1/api/v3/time']['reused'] == 1
+    assert not any('SECRET' in endpoint for endpoint in stats)
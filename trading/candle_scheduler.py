@@ -0,0 +1,90 @@
+import logging
+import time
+from config import settings
+from trading.market_data import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class CandleCloseScheduler:
+    """
+    Gate signal and score evaluation on candle closes.
+
+    Each (purpose, pair) remembers the latest closed bar it was evaluated on per
+    timeframe. An evaluation is only due once a newer bar has closed on at least one
+    of the relevant timeframes, so CPU time and API requests go to new information.
+    """
+
+    def __init__(self, grace_seconds=None, clock=time.time):
+        self.grace_ms = int((grace_seconds if grace_seconds is not None else settings.CANDLE_CLOSE_GRACE_SECONDS) * 1000)
+        self.clock = clock
+        self.last_evaluated = {}  # (purpose, pair, timeframe) -> close time (ms) of the last evaluated bar
+        self.first_new = {}       # (purpose, pair, timeframe) -> close time (ms) of the first bar the latest evaluation saw
+        self.counters = {}        # purpose -> {'evaluated': int, 'skipped': int}
+
+    def latest_close(self, timeframe, now_ms=None):
+        """
+        Close time (ms) of the most recent bar that has closed and had time to settle.
+        """
+        if now_ms is None:
+            now_ms = int(self.clock() * 1000)
+        step = timeframe_to_ms(timeframe)
+        return (now_ms - self.grace_ms) // step * step
+
+    def should_evaluate(self, purpose, pair, timeframes):
+        """
+        Return True (and record the new bars) if any timeframe closed a bar since the last evaluation.
+        """
+        now_ms = int(self.clock() * 1000)
+        closes = {timeframe: self.latest_close(timeframe, now_ms) for timeframe in timeframes}
+        due = any(close > self.last_evaluated.get((purpose, pair, timeframe), -1) for timeframe, close in closes.items())
+
+        counter = self.counters.setdefault(purpose, {'evaluated': 0, 'skipped': 0})
+        if not due:
+            counter['skipped'] += 1
+            return False
+
+        counter['evaluated'] += 1
+        for timeframe, close in closes.items():
+            key = (purpose, pair, timeframe)
+            previous = self.last_evaluated.get(key)
+            if previous is not None and close > previous:
+                self.first_new[key] = previous + timeframe_to_ms(timeframe)
+            else:
+                self.first_new.pop(key, None)
+            self.last_evaluated[key] = close
+        return True
+
+    def first_unevaluated_close(self, purpose, pair, timeframe):
+        """
+        Close time (ms) of the oldest bar that was new to the latest due evaluation, i.e. the
+        bar whose close first made it due, or None when no earlier evaluation is known.
+        """
+        return self.first_new.get((purpose, pair, timeframe))
+
+    def mark_evaluated(self, purpose, pair, timeframes, at_ms):
+        """
+        Record the bars that had closed at `at_ms` as evaluated (e.g. when restoring saved state).
+        """
+        for timeframe in timeframes:
+            self.last_evaluated[(purpose, pair, timeframe)] = self.latest_close(timeframe, at_ms)
+
+    def invalidate(self, purpose, pair):
+        """
+        Forget recorded bars so the next check evaluates again (e.g. after a failed fetch).
+        """
+        for key in [key for key in self.last_evaluated if key[0] == purpose and key[1] == pair]:
+            del self.last_evaluated[key]
+            self.first_new.pop(key, None)
+
+    def seconds_until_next_close(self, timeframes):
+        now_ms = int(self.clock() * 1000)
+        next_closes = [self.latest_close(timeframe, now_ms) + timeframe_to_ms(timeframe) for timeframe in timeframes]
+        return max(0.0, (min(next_closes) + self.grace_ms - now_ms) / 1000)
+
+    def log_counters(self):
+        for purpose, counter in self.counters.items():
+            total = counter['evaluated'] + counter['skipped']
+            skipped_ratio = counter['skipped'] / total if total else 0
+            logger.info(f"Candle-close scheduler [{purpose}]: evaluated {counter['evaluated']}, "
+                        f"skipped {counter['skipped']} ({skipped_ratio:.0%}).")
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+import numpy as np
+import ccxt.async_support as ccxt
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('closed', 'canceled', 'expired', 'rejected')
+
+
+class OrderExecutor:
+    """
+    Low-latency market order execution.
+
+    Orders are validated and rounded locally against the cached market filters (lot
+    size, minimum amount and minimum notional) so they are not rejected by the exchange.
+    Every order carries a client order ID; after a network failure the executor looks
+    the order up by that ID (again after a short delay) before resubmitting, and never
+    resubmits an order it could not look up, so retries don't double-fill. Exits for
+    many positions can be sent concurrently, and submit-to-fill latency is recorded.
+    With a state journal, submissions and their outcomes are journaled so orders that
+    were in flight during a crash can be resolved after a restart. An order placed to
+    open or close a position carries that intent on its submission record, so the fill
+    record alone opens or closes the position in the journal.
+    """
+
+    def __init__(self, exchange, max_retries=None, retry_backoff=None, fill_timeout=None, journal=None):
+        self.exchange = exchange
+        self.journal = journal
+        self.max_retries = max_retries if max_retries is not None else settings.ORDER_MAX_RETRIES
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.ORDER_RETRY_BACKOFF
+        self.fill_timeout = fill_timeout if fill_timeout is not None else settings.ORDER_FILL_TIMEOUT
+        self.fill_latencies = {'buy': deque(maxlen=200), 'sell': deque(maxlen=200)}  # Seconds
+        self._markets_lock = asyncio.Lock()
+
+    async def ensure_markets(self):
+        if not self.exchange.markets:
+            async with self._markets_lock:
+                if not self.exchange.markets:
+                    await self.exchange.load_markets()
+
+    def market_filters(self, pair):
+        market = self.exchange.market(pair)
+        limits = market.get('limits', {})
+        return {
+            'min_amount': (limits.get('amount') or {}).get('min'),
+            'max_amount': (limits.get('amount') or {}).get('max'),
+            'min_cost': (limits.get('cost') or {}).get('min'),
+        }
+
+    def prepare_amount(self, pair, amount, price=None):
+        """
+        Round an order amount down to the lot size and check it against the market filters.
+
+        Returns:
+            tuple: (rounded amount or None, rejection reason or None).
+        """
+        filters = self.market_filters(pair)
+        if filters['max_amount']:
+            amount = min(amount, filters['max_amount'])
+        try:
+            rounded = float(self.exchange.amount_to_precision(pair, amount))
+        except ccxt.InvalidOrder as e:
+            return None, str(e)
+        if rounded <= 0 or (filters['min_amount'] and rounded < filters['min_amount']):
+            return None, f"amount {amount} is below the minimum lot size {filters['min_amount']}"
+        if price and filters['min_cost'] and rounded * price < filters['min_cost']:
+            return None, f"notional {rounded * price:.8f} is below the minimum {filters['min_cost']}"
+        return rounded, None
+
+    def prepare_cost(self, pair, cost):
+        """
+        Round a quote-currency spend and check it against the minimum notional.
+        """
+        filters = self.market_filters(pair)
+        rounded = float(self.exchange.cost_to_precision(pair, cost))
+        if rounded <= 0 or (filters['min_cost'] and rounded < filters['min_cost']):
+            return None, f"cost {cost} is below the minimum notional {filters['min_cost']}"
+        return rounded, None
+
+    def new_client_order_id(self, side):
+        # Binance accepts up to 36 characters from [.A-Z:/a-z0-9_-]
+        return f"{settings.CLIENT_ORDER_ID_PREFIX}-{side[0]}-{uuid.uuid4().hex[:24]}"
+
+    async def find_order(self, pair, client_order_id):
+        try:
+            return await self.exchange.fetch_order(None, pair, {'origClientOrderId': client_order_id})
+        except ccxt.OrderNotFound:
+            return None
+
+    async def _find_after_failure(self, pair, client_order_id, attempt):
+        """
+        Look an order up by client order ID after a failed submission: once right away and,
+        if it is not there, once more after the retry backoff, since an order accepted just
+        before the connection failed can take a moment to become visible.
+
+        Returns:
+            dict: The order, or None if neither lookup found it. A NetworkError from the
+            lookup propagates, so an order whose fate is unknown is never resubmitted.
+        """
+        order = await self.find_order(pair, client_order_id)
+        if order is None:
+            await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            order = await self.find_order(pair, client_order_id)
+        return order
+
+    async def _submit(self, pair, side, amount=None, cost=None, intent=None):
+        client_order_id = self.new_client_order_id(side)
+        params = {'newClientOrderId': client_order_id}
+        if self.journal:
+            self.journal.append('order_submitted', pair=pair, side=side, client_order_id=client_order_id,
+                                amount=amount, cost=cost, intent=intent)
+        started = time.monotonic()
+        order = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if cost is not None:
+                        order = await self.exchange.create_market_buy_order_with_cost(pair, cost, params)
+                    else:
+                        order = await self.exchange.create_order(pair, 'market', side, amount, None, params)
+                    break
+                except ccxt.NetworkError as e:
+                    # The order may have reached the exchange before the connection failed; the same
+                    # newClientOrderId is resubmitted only when the lookup shows it never arrived.
+                    order = await self._find_after_failure(pair, client_order_id, attempt)
+                    if order is not None:
+                        logger.info(f"Recovered {side} order {client_order_id} for {pair} after: {e}")
+                        break
+                    if attempt == self.max_retries:
+                        raise
+                    logger.warning(f"Retrying {side} order {client_order_id} for {pair} after: {e}")
+            order = await self._await_fill(pair, order, client_order_id)
+        except ccxt.NetworkError:
+            raise  # Outcome unknown; left unresolved in the journal for a lookup after restart
+        except Exception as e:
+            if self.journal:
+                self.journal.append('order_failed', client_order_id=client_order_id, error=str(e))
+            raise
+
+        self.record_fill(pair, client_order_id, order)
+        if order.get('status') == 'closed':
+            latency = time.monotonic() - started
+            self.fill_latencies[side].append(latency)
+            logger.info(f"{side.capitalize()} order {client_order_id} for {pair} filled in {latency * 1000:.0f}ms.")
+        return order
+
+    def record_fill(self, pair, client_order_id, order):
+        """
+        Journal the outcome of an order; with an intent on its submission this also opens or closes the position.
+        """
+        if self.journal:
+            self.journal.append('order_filled', client_order_id=client_order_id, status=order.get('status'),
+                                filled=order.get('filled'), net_filled=self.net_filled(order, pair),
+                                average=order.get('average'), cost=order.get('cost'))
+
+    async def _await_fill(self, pair, order, client_order_id):
+        """
+        Poll an accepted order until it reaches a terminal status or the fill timeout passes.
+
+        Network errors while polling don't abandon the order: it keeps being looked up by
+        client order ID, with one last lookup at the deadline before the error is raised.
+        """
+        deadline = time.monotonic() + self.fill_timeout
+        error = None
+        while (error is not None or order.get('status') not in TERMINAL_STATUSES) and time.monotonic() < deadline:
+            await asyncio.sleep(settings.ORDER_FILL_POLL_INTERVAL)
+            try:
+                found = await self.find_order(pair, client_order_id)
+            except ccxt.NetworkError as e:
+                logger.warning(f"Could not poll order {client_order_id} for {pair}: {e}")
+                error = e
+                continue
+            error = None
+            if found is not None:
+                order = found
+        if error is not None:
+            found = await self.find_order(pair, client_order_id)
+            if found is not None:
+                order = found
+        return order
+
+    async def buy(self, pair, quote_amount, intent=None):
+        """
+        Market buy spending `quote_amount` of the quote currency (no stale price needed).
+
+        `intent` (e.g. {'action': 'open', ...}) is journaled with the submission and applied with the fill.
+        """
+        await self.ensure_markets()
+        cost, reason = self.prepare_cost(pair, quote_amount)
+        if cost is None:
+            logger.error(f"Buy order for {pair} rejected locally: {reason}")
+            return None
+        return await self._submit(pair, 'buy', cost=cost, intent=intent)
+
+    async def market_order(self, pair, side, amount, price=None, intent=None):
+        """
+        Market order for a base-currency amount, rounded to the market's lot size.
+        """
+        await self.ensure_markets()
+        rounded, reason = self.prepare_amount(pair, amount, price)
+        if rounded is None:
+            logger.error(f"{side.capitalize()} order for {pair} rejected locally: {reason}")
+            return None
+        if intent and intent.get('action') == 'close':
+            # Lets the journal close a position once only an unsellable remainder is left
+            intent = dict(intent, min_amount=self.market_filters(pair)['min_amount'])
+        return await self._submit(pair, side, amount=rounded, intent=intent)
+
+    async def close_positions(self, positions, reason=None):
+        """
+        Submit market sells for many positions concurrently.
+
+        Parameters:
+            positions (list): (pair, amount) or (pair, amount, price) tuples.
+            reason (str, optional): Close reason journaled with each exit.
+
+        Returns:
+            list: Order dicts, None for locally rejected exits, or the raised exception.
+        """
+        return await asyncio.gather(
+            *(self.market_order(position[0], 'sell', position[1], *position[2:],
+                                intent={'action': 'close', 'pair': position[0], 'reason': reason})
+              for position in positions),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    def net_filled(order, pair):
+        """
+        Filled base amount after fees charged in the base currency.
+        """
+        base = pair.split('/')[0]
+        fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+        base_fees = sum(fee.get('cost') or 0 for fee in fees if fee and fee.get('currency') == base)
+        return (order.get('filled') or 0) - base_fees
+
+    def log_latency(self):
+        for side, latencies in self.fill_latencies.items():
+            if latencies:
+                p50, p95 = np.percentile(list(latencies), [50, 95])
+                logger.info(f"Submit-to-fill latency ({side}): p50 {p50 * 1000:.0f}ms, "
+                            f"p95 {p95 * 1000:.0f}ms, max {max(latencies) * 1000:.0f}ms over {len(latencies)} orders")
@@ -0,0 +1,421 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+import aiohttp
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAME_UNITS_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+    'M': 30 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe):
+    """
+    Convert a ccxt/Binance timeframe string (e.g. '1m', '4h') to milliseconds.
+    """
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in TIMEFRAME_UNITS_MS or not amount.isdigit():
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(amount) * TIMEFRAME_UNITS_MS[unit]
+
+
+def pair_to_stream_symbol(pair):
+    """
+    Convert a unified pair ('DOGE/USDT') to the Binance stream symbol ('dogeusdt').
+    """
+    return pair.replace('/', '').lower()
+
+
+class _StreamConnection:
+    """
+    A single multiplexed websocket connection carrying a subset of the feed's streams.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.streams = set()
+        self.ws = None
+        self.task = None
+        self.connected = False
+
+
+class MarketDataFeed:
+    """
+    Streaming market data for the active universe.
+
+    Kline, partial book depth and trade streams are spread over multiplexed Binance
+    websocket connections. Candle caches are seeded and gap-filled through the REST
+    exchange client, and every read falls back to REST while a stream is cold,
+    disconnected or stale, so consumers can use the feed transparently.
+    """
+
+    def __init__(self, exchange, timeframes=None, base_url=None, max_streams_per_connection=None,
+                 depth_levels=None, candle_limit=None, stale_after=None, heartbeat=None, session=None):
+        self.exchange = exchange
+        self.timeframes = list(timeframes or dict.fromkeys(settings.TIMEFRAMES + settings.TIMEFRAMES_FOR_SCORE))
+        self.base_url = base_url or settings.WS_BASE_URL
+        self.max_streams_per_connection = max_streams_per_connection or settings.WS_MAX_STREAMS_PER_CONNECTION
+        self.depth_levels = depth_levels or settings.WS_DEPTH_LEVELS
+        self.candle_limit = candle_limit or settings.WS_CANDLE_LIMIT
+        self.stale_after = stale_after if stale_after is not None else settings.WS_STALE_AFTER
+        self.heartbeat = heartbeat if heartbeat is not None else settings.WS_HEARTBEAT
+        self.reconnect_delay = settings.WS_RECONNECT_DELAY
+        self.max_reconnect_delay = settings.WS_MAX_RECONNECT_DELAY
+
+        self.pairs = set()
+        self.candles = {}        # (pair, timeframe) -> list of [timestamp, open, high, low, close, volume]
+        self.order_books = {}    # pair -> {'bids', 'asks', 'timestamp', 'received'}
+        self.trades = {}         # pair -> deque of recent trades
+        self.last_trade = {}     # pair -> latest trade
+        self.stats = {'messages': 0, 'reconnects': 0, 'backfills': 0, 'rest_fallbacks': 0}
+
+        self._session = session
+        self._own_session = session is None
+        self._connections = []
+        self._stream_pairs = {}  # stream name -> pair
+        self._synced = set()     # streams whose cached state is complete and live
+        self._received = {}      # stream name -> monotonic time of its last message or REST sync
+        self._backfills = {}     # (pair, timeframe) -> pending backfill task
+        self._request_id = 0
+        self._closing = False
+
+    # ------------------------------------------------------------------
+    # Lifecycle and subscriptions
+    # ------------------------------------------------------------------
+    async def start(self, pairs):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        self._closing = False
+        await self.set_universe(pairs)
+
+    async def stop(self):
+        self._closing = True
+        for task in list(self._backfills.values()):
+            task.cancel()
+        for conn in self._connections:
+            await self._close_connection(conn)
+        self._connections = []
+        if self._session is not None and self._own_session:
+            await self._session.close()
+            self._session = None
+
+    def streams_for(self, pair):
+        symbol = pair_to_stream_symbol(pair)
+        streams = [f"{symbol}@kline_{timeframe}" for timeframe in self.timeframes]
+        streams.append(f"{symbol}@depth{self.depth_levels}@100ms")
+        streams.append(f"{symbol}@trade")
+        return streams
+
+    async def set_universe(self, pairs):
+        """
+        Subscribe to streams for new pairs and unsubscribe from pairs that left the universe.
+        """
+        pairs = set(pairs)
+        desired = {stream: pair for pair in pairs for stream in self.streams_for(pair)}
+        removed = set(self._stream_pairs) - set(desired)
+        added = [stream for stream in desired if stream not in self._stream_pairs]
+
+        for conn in list(self._connections):
+            gone = conn.streams & removed
+            if not gone:
+                continue
+            conn.streams -= gone
+            if conn.streams:
+                await self._send(conn, 'UNSUBSCRIBE', sorted(gone))
+            else:
+                await self._close_connection(conn)
+                self._connections.remove(conn)
+
+        for stream in removed:
+            self._stream_pairs.pop(stream, None)
+            self._synced.discard(stream)
+            self._received.pop(stream, None)
+        for pair in self.pairs - pairs:
+            self._drop_pair(pair)
+
+        for stream in added:
+            self._stream_pairs[stream] = desired[stream]
+        while added:
+            conn = next((c for c in self._connections if len(c.streams) < self.max_streams_per_connection), None)
+            if conn is None:
+                conn = _StreamConnection(len(self._connections))
+                self._connections.append(conn)
+            batch = added[:self.max_streams_per_connection - len(conn.streams)]
+            added = added[len(batch):]
+            conn.streams.update(batch)
+            if conn.task is None:
+                conn.task = asyncio.create_task(self._run_connection(conn))
+            else:
+                await self._send(conn, 'SUBSCRIBE', batch)
+
+        if pairs != self.pairs:
+            logger.info(f"Market data universe: {len(pairs)} pairs over {len(self._connections)} websocket connection(s).")
+        self.pairs = pairs
+
+    def restore_candles(self, candles, pairs=None):
+        """
+        Seed candle caches from a saved snapshot before start().
+
+        Restored caches are not live; when their streams connect only the candles
+        missed since the snapshot are backfilled through REST.
+        """
+        restored = 0
+        for (pair, timeframe), rows in candles.items():
+            if rows and timeframe in self.timeframes and (pairs is None or pair in pairs):
+                self.candles[(pair, timeframe)] = [list(row) for row in rows[-self.candle_limit:]]
+                restored += 1
+        logger.info(f"Restored {restored} candle caches from snapshot.")
+        return restored
+
+    def _drop_pair(self, pair):
+        for key in [key for key in self.candles if key[0] == pair]:
+            del self.candles[key]
+            task = self._backfills.pop(key, None)
+            if task:
+                task.cancel()
+        self.order_books.pop(pair, None)
+        self.trades.pop(pair, None)
+        self.last_trade.pop(pair, None)
+
+    async def _close_connection(self, conn):
+        if conn.task is not None:
+            conn.task.cancel()
+            try:
+                await conn.task
+            except (asyncio.CancelledError, Exception):
+                pass
+            conn.task = None
+
+    async def _send(self, conn, method, streams):
+        if conn.ws is None or not conn.connected:
+            return  # Subscriptions are replayed when the connection (re)opens
+        for start in range(0, len(streams), 100):
+            self._request_id += 1
+            await conn.ws.send_json({'method': method, 'params': streams[start:start + 100], 'id': self._request_id})
+
+    async def _run_connection(self, conn):
+        delay = self.reconnect_delay
+        first_attempt = True
+        while not self._closing:
+            if not first_attempt:
+                self.stats['reconnects'] += 1
+            first_attempt = False
+            try:
+                async with self._session.ws_connect(self.base_url, autoping=True,
+                                                   heartbeat=self.heartbeat or None) as ws:
+                    conn.ws = ws
+                    conn.connected = True
+                    if conn.streams:
+                        await self._send(conn, 'SUBSCRIBE', sorted(conn.streams))
+                    delay = self.reconnect_delay
+                    self._resync_candles(conn)
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle_message(json.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Websocket connection {conn.index} error: {e}")
+            finally:
+                conn.connected = False
+                conn.ws = None
+                self._synced -= conn.streams
+
+            if self._closing:
+                break
+            logger.info(f"Websocket connection {conn.index} closed. Reconnecting in {delay}s.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _resync_candles(self, conn):
+        """
+        Backfill the candles missed while a connection was down.
+        """
+        for stream in conn.streams:
+            if '@kline_' not in stream:
+                continue
+            key = (self._stream_pairs[stream], stream.split('@kline_')[1])
+            if key in self.candles:
+                self._schedule_backfill(key)
+
+    # ------------------------------------------------------------------
+    # Stream handlers
+    # ------------------------------------------------------------------
+    def _handle_message(self, message):
+        stream = message.get('stream')
+        data = message.get('data')
+        pair = self._stream_pairs.get(stream)
+        if pair is None or data is None:
+            return  # Subscription acknowledgements or streams we already dropped
+        self.stats['messages'] += 1
+        self._received[stream] = time.monotonic()
+        if '@kline_' in stream:
+            self._on_kline(pair, stream, data)
+        elif '@depth' in stream:
+            self._on_depth(pair, stream, data)
+        elif stream.endswith('@trade'):
+            self._on_trade(pair, stream, data)
+
+    def _on_kline(self, pair, stream, data):
+        kline = data['k']
+        timeframe = kline['i']
+        key = (pair, timeframe)
+        candles = self.candles.get(key)
+        if candles is None:
+            return  # Not seeded yet; the first read seeds the cache through REST
+        row = [kline['t'], float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v'])]
+        last_timestamp = candles[-1][0]
+        if row[0] == last_timestamp:
+            candles[-1] = row
+        elif row[0] > last_timestamp:
+            if row[0] - last_timestamp > timeframe_to_ms(timeframe):
+                logger.info(f"Candle gap detected for {pair} {timeframe}. Backfilling via REST.")
+                self._synced.discard(stream)
+                self._schedule_backfill(key, since=last_timestamp)
+            candles.append(row)
+            if len(candles) > self.candle_limit:
+                del candles[:len(candles) - self.candle_limit]
+
+    def _on_depth(self, pair, stream, data):
+        self.order_books[pair] = {
+            'symbol': pair,
+            'bids': [[float(price), float(amount)] for price, amount in data.get('bids', [])],
+            'asks': [[float(price), float(amount)] for price, amount in data.get('asks', [])],
+            'nonce': data.get('lastUpdateId'),
+            'timestamp': int(time.time() * 1000),
+            'received': time.monotonic(),
+        }
+        self._synced.add(stream)
+
+    def _on_trade(self, pair, stream, data):
+        trade = {
+            'price': float(data['p']),
+            'amount': float(data['q']),
+            'timestamp': data['T'],
+            'side': 'sell' if data.get('m') else 'buy',
+            'received': time.monotonic(),
+        }
+        self.trades.setdefault(pair, deque(maxlen=500)).append(trade)
+        self.last_trade[pair] = trade
+        self._synced.add(stream)
+
+    # ------------------------------------------------------------------
+    # REST seeding and gap backfill
+    # ------------------------------------------------------------------
+    def _schedule_backfill(self, key, since=None):
+        task = self._backfills.get(key)
+        if task is None or task.done():
+            self._backfills[key] = asyncio.create_task(self._backfill(key, since))
+        return self._backfills[key]
+
+    async def _backfill(self, key, since=None):
+        pair, timeframe = key
+        candles = self.candles.get(key)
+        if since is None and candles:
+            since = candles[-1][0]
+        if since is not None:
+            missed_bars = (time.time() * 1000 - since) / timeframe_to_ms(timeframe)
+            if missed_bars >= self.candle_limit:
+                since = None  # Gap is longer than the cache, refetch the latest window instead
+        try:
+            self.stats['backfills'] += 1
+            ohlcv = await self.exchange.fetch_ohlcv(pair, timeframe=timeframe, since=since, limit=self.candle_limit)
+            self._merge_candles(key, ohlcv, replace=since is None)
+            self._mark_synced(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error backfilling {pair} {timeframe} candles: {e}")
+        finally:
+            self._backfills.pop(key, None)
+
+    def _merge_candles(self, key, ohlcv, replace=False):
+        merged = {} if replace else {row[0]: row for row in self.candles.get(key, [])}
+        for row in ohlcv or []:
+            merged[row[0]] = list(row)
+        rows = [merged[timestamp] for timestamp in sorted(merged)]
+        self.candles[key] = rows[-self.candle_limit:]
+
+    def _mark_synced(self, key):
+        pair, timeframe = key
+        stream = f"{pair_to_stream_symbol(pair)}@kline_{timeframe}"
+        conn = self._connection_for(stream)
+        if conn is not None and conn.connected:
+            self._synced.add(stream)
+            self._received[stream] = time.monotonic()
+
+    def _connection_for(self, stream):
+        return next((conn for conn in self._connections if stream in conn.streams), None)
+
+    def _is_live(self, stream):
+        if stream not in self._synced:
+            return False
+        received = self._received.get(stream)
+        if self.stale_after and (received is None or time.monotonic() - received > self.stale_after):
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Consumer API
+    # ------------------------------------------------------------------
+    async def fetch_ohlcv(self, pair, timeframe, limit=1000):
+        """
+        Return OHLCV rows in ccxt format, from the stream cache when it is live.
+        """
+        key = (pair, timeframe)
+        stream = f"{pair_to_stream_symbol(pair)}@kline_{timeframe}"
+        candles = self.candles.get(key)
+        if candles and self._is_live(stream) and len(candles) >= min(limit, self.candle_limit):
+            return [list(row) for row in candles[-limit:]]
+
+        self.stats['rest_fallbacks'] += 1
+        pending = self._backfills.get(key)
+        if pending is not None:
+            await asyncio.shield(pending)
+            candles = self.candles.get(key)
+            if candles and len(candles) >= min(limit, self.candle_limit):
+                return [list(row) for row in candles[-limit:]]
+
+        ohlcv = await self.exchange.fetch_ohlcv(pair, timeframe=timeframe, limit=limit)
+        if pair in self.pairs and timeframe in self.timeframes and ohlcv:
+            self._merge_candles(key, ohlcv, replace=True)
+            self._mark_synced(key)
+        return ohlcv
+
+    def get_order_book(self, pair):
+        book = self.order_books.get(pair)
+        stream = f"{pair_to_stream_symbol(pair)}@depth{self.depth_levels}@100ms"
+        if book is None or not self._is_live(stream):
+            return None
+        return book
+
+    async def fetch_order_book(self, pair):
+        book = self.get_order_book(pair)
+        if book is not None:
+            return book
+        self.stats['rest_fallbacks'] += 1
+        return await self.exchange.fetch_order_book(pair)
+
+    def get_last_price(self, pair):
+        trade = self.last_trade.get(pair)
+        if trade is None or not self._is_live(f"{pair_to_stream_symbol(pair)}@trade"):
+            return None
+        return trade['price']
+
+    async def fetch_ticker(self, pair):
+        trade = self.last_trade.get(pair)
+        if trade is not None and self._is_live(f"{pair_to_stream_symbol(pair)}@trade"):
+            return {'symbol': pair, 'last': trade['price'], 'timestamp': trade['timestamp']}
+        self.stats['rest_fallbacks'] += 1
+        return await self.exchange.fetch_ticker(pair)
@@ -0,0 +1,222 @@
+import logging
+import time
+from config import settings
+from trading.strategy import (timeframe_confidences, aggregate_confidences, analyze_order_book, blend_ml_probability,
+                              determine_final_signal)
+from trading.market_data import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+def best_price(order_book, side):
+    """
+    Best ask for a buy or best bid for a sell, or None when that side of the book is empty.
+    """
+    levels = (order_book or {}).get('asks' if side == 'buy' else 'bids') or []
+    return levels[0][0] if levels else None
+
+
+def shared_evaluation(data, order_book, timeframes):
+    """
+    Strategy-independent part of a paper evaluation, run once per pair (and off the loop).
+
+    Returns:
+        dict: {'confidences', 'order_book_signal'}.
+    """
+    return {
+        'confidences': timeframe_confidences(data, timeframes),
+        'order_book_signal': analyze_order_book(order_book),
+    }
+
+
+class PaperBook:
+    """
+    Simulated account of one strategy: cash, open positions, closed trades and fees.
+    """
+
+    def __init__(self, name, starting_balance=None, fee_rate=None, max_positions=None):
+        self.name = name
+        self.starting_balance = starting_balance if starting_balance is not None else settings.PAPER_STARTING_BALANCE
+        self.fee_rate = fee_rate if fee_rate is not None else settings.PAPER_FEE_RATE
+        self.max_positions = max_positions or settings.PAPER_MAX_POSITIONS
+        self.cash = self.starting_balance
+        self.positions = {}  # pair -> position dict
+        self.trades = []     # closed trades
+        self.fees_paid = 0.0
+
+    def can_open(self, pair):
+        return pair not in self.positions and len(self.positions) < self.max_positions and self.cash > 0
+
+    def open(self, pair, price, take_profit_percentage, stop_loss_percentage, timestamp=None):
+        """
+        Buy at `price`, spending an even share of the cash left for the free position slots.
+        The fee is taken from the bought amount, as Binance does for market buys.
+        """
+        quote_amount = self.cash / (self.max_positions - len(self.positions))
+        fee = quote_amount * self.fee_rate
+        position = {
+            'amount': (quote_amount - fee) / price,
+            'entry_price': price,
+            'cost': quote_amount,
+            'profit_percentage': take_profit_percentage,
+            'take_profit_price': price * (1 + take_profit_percentage),
+            'stop_loss_price': price * (1 - stop_loss_percentage),
+            'opened_at': timestamp or time.time(),
+        }
+        self.cash -= quote_amount
+        self.fees_paid += fee
+        self.positions[pair] = position
+        logger.info(f"[paper:{self.name}] Bought {position['amount']:.8f} {pair} at {price}")
+        return position
+
+    def close(self, pair, price, reason, timestamp=None):
+        position = self.positions.pop(pair)
+        gross = position['amount'] * price
+        fee = gross * self.fee_rate
+        self.cash += gross - fee
+        self.fees_paid += fee
+        trade = {
+            'pair': pair,
+            'entry_price': position['entry_price'],
+            'exit_price': price,
+            'pnl': gross - fee - position['cost'],
+            'return': (gross - fee) / position['cost'] - 1,
+            'reason': reason,
+            'opened_at': position['opened_at'],
+            'closed_at': timestamp or time.time(),
+        }
+        self.trades.append(trade)
+        logger.info(f"[paper:{self.name}] {reason} on {pair} at {price}: PnL {trade['pnl']:.4f} USDT")
+        return trade
+
+    def equity(self, prices=None):
+        """
+        Cash plus open positions marked at `prices` (entry price when a pair has no price).
+        """
+        prices = prices or {}
+        return self.cash + sum(position['amount'] * (prices.get(pair) or position['entry_price'])
+                               for pair, position in self.positions.items())
+
+    def summary(self, prices=None):
+        wins = sum(1 for trade in self.trades if trade['pnl'] > 0)
+        equity = self.equity(prices)
+        return {
+            'equity': equity,
+            'pnl': equity - self.starting_balance,
+            'realized_pnl': sum(trade['pnl'] for trade in self.trades),
+            'trades': len(self.trades),
+            'win_rate': wins / len(self.trades) if self.trades else None,
+            'fees': self.fees_paid,
+            'open_positions': len(self.positions),
+        }
+
+
+class PaperTradingEngine:
+    """
+    Fan one market-data and indicator pipeline out to many strategy configurations.
+
+    Candles for the union of all strategy timeframes are fetched once per pair, the
+    per-timeframe conditions and the order book signal are evaluated once, and each
+    strategy only re-weights them with its own timeframe weights and thresholds. Fills
+    are simulated at the best ask (buys) or best bid (sells) with PAPER_FEE_RATE, and
+    exits follow the live take-profit / stop-loss rules.
+    """
+
+    def __init__(self, strategies=None, starting_balance=None, fee_rate=None, max_positions=None):
+        self.strategies = {}
+        for name, config in (strategies or settings.PAPER_STRATEGIES).items():
+            self.strategies[name] = {
+                'timeframes': list(config.get('timeframes') or settings.TIMEFRAMES),
+                'timeframe_weights': config.get('timeframe_weights') or settings.TIMEFRAME_WEIGHTS,
+                'buy_threshold': config.get('buy_threshold', settings.BUY_CONFIDENCE_THRESHOLD),
+                'sell_threshold': config.get('sell_threshold', settings.SELL_CONFIDENCE_THRESHOLD),
+                'take_profit': config.get('take_profit', settings.TAKE_PROFIT_PERCENTAGE),
+                'stop_loss': config.get('stop_loss', settings.STOP_LOSS_PERCENTAGE),
+            }
+        self.books = {name: PaperBook(name, starting_balance, fee_rate, max_positions) for name in self.strategies}
+
+        # Union of every timeframe the strategies evaluate, in ascending order
+        union = dict.fromkeys(timeframe for config in self.strategies.values() for timeframe in config['timeframes'])
+        self.timeframes = sorted(union, key=timeframe_to_ms)
+        self.feed_timeframes = sorted(dict.fromkeys(self.timeframes + settings.TIMEFRAMES_FOR_SCORE), key=timeframe_to_ms)
+
+    def open_pairs(self):
+        return {pair for book in self.books.values() for pair in book.positions}
+
+    def evaluate(self, pair, data, order_book, ml_probability=None, shared=None):
+        """
+        Evaluate every strategy on one pair's shared data and simulate their entries.
+
+        Parameters:
+            pair (str): Trading pair.
+            data (dict): Timeframe -> indicator DataFrame covering self.timeframes.
+            order_book (dict): Order book with 'bids' and 'asks'.
+            ml_probability (float, optional): Model probability blended into every strategy.
+            shared (dict, optional): Precomputed shared_evaluation() for this pair.
+
+        Returns:
+            dict: Strategy name -> {'signal', 'buy_confidence', 'sell_confidence'}.
+        """
+        if shared is None:
+            shared = shared_evaluation(data, order_book, self.timeframes)
+        confidences = shared['confidences']
+        order_book_signal = shared['order_book_signal']
+
+        results = {}
+        for name, config in self.strategies.items():
+            strategy_confidences = {tf: confidences[tf] for tf in config['timeframes'] if tf in confidences}
+            buy_confidence, sell_confidence, _ = aggregate_confidences(strategy_confidences, config['timeframe_weights'])
+            buy_confidence, sell_confidence = blend_ml_probability(buy_confidence, sell_confidence, ml_probability)
+            signal = determine_final_signal(buy_confidence, sell_confidence, order_book_signal,
+                                            buy_threshold=config['buy_threshold'], sell_threshold=config['sell_threshold'])
+            results[name] = {'signal': signal, 'buy_confidence': buy_confidence, 'sell_confidence': sell_confidence}
+
+            book = self.books[name]
+            if signal == "buy" and book.can_open(pair):
+                price = best_price(order_book, 'buy')
+                if price:
+                    book.open(pair, price, config['take_profit'], config['stop_loss'])
+        return results
+
+    def ratchet(self, pair, score):
+        """
+        Raise (or lower) the take-profit of every open position on `pair` by the indicator score.
+        """
+        for book in self.books.values():
+            position = book.positions.get(pair)
+            if position is None:
+                continue
+            position['profit_percentage'] = min(position['profit_percentage'] + score * settings.PROFIT_STEP,
+                                                settings.MAX_PROFIT_PERCENTAGE)
+            position['take_profit_price'] = position['entry_price'] * (1 + position['profit_percentage'])
+
+    def check_exits(self, pair, price, order_book=None):
+        """
+        Close positions on `pair` whose take-profit or stop-loss has been reached.
+
+        Triggers use the last traded price; fills use the best bid when a book is given.
+
+        Returns:
+            list: Closed trades.
+        """
+        closed = []
+        fill_price = best_price(order_book, 'sell') or price
+        for book in self.books.values():
+            position = book.positions.get(pair)
+            if position is None:
+                continue
+            if price >= position['take_profit_price']:
+                closed.append(book.close(pair, fill_price, 'Take-Profit'))
+            elif price <= position['stop_loss_price']:
+                closed.append(book.close(pair, fill_price, 'Stop-Loss'))
+        return closed
+
+    def summaries(self, prices=None):
+        return {name: book.summary(prices) for name, book in self.books.items()}
+
+    def log_report(self, prices=None):
+        for name, summary in self.summaries(prices).items():
+            win_rate = f"{summary['win_rate']:.0%}" if summary['win_rate'] is not None else "n/a"
+            logger.info(f"[paper:{name}] equity {summary['equity']:.2f} USDT, PnL {summary['pnl']:+.2f} "
+                        f"(realized {summary['realized_pnl']:+.2f}), {summary['trades']} trades, "
+                        f"win rate {win_rate}, fees {summary['fees']:.2f}, {summary['open_positions']} open")
@@ -0,0 +1,329 @@
+import bisect
+import itertools
+import logging
+import time
+import numpy as np
+from config import settings
+from trading.market_data import timeframe_to_ms
+
+logger = logging.getLogger(__name__)
+
+
+class RollingCovariance:
+    """
+    Rolling covariance of per-bar log returns across a universe of pairs.
+
+    Keeps a ring buffer of the last `window` return vectors together with running
+    sums and the running sum of outer products. Adding a bar adds its outer product
+    and subtracts the one of the evicted bar, so an update costs O(n²) instead of the
+    O(window · n²) of recomputing from the buffer. The running sums are rebuilt from
+    the buffer every `resync_interval` updates to stop floating-point drift.
+
+    A pair without a close on a bar contributes a zero return for that bar and for the
+    next one, so a return never spans more than one bar; the number of real observations
+    per pair is tracked so thinly observed pairs can be treated separately.
+    """
+
+    def __init__(self, pairs, window=None, resync_interval=None):
+        self.window = window or settings.PORTFOLIO_WINDOW
+        self.resync_interval = resync_interval or self.window
+        self.pairs = list(pairs)
+        self.index = {pair: i for i, pair in enumerate(self.pairs)}
+        n = len(self.pairs)
+        self.buffer = np.zeros((self.window, n))
+        self.observed = np.zeros((self.window, n), dtype=bool)
+        self.sums = np.zeros(n)
+        self.products = np.zeros((n, n))
+        self.observations = np.zeros(n, dtype=int)
+        self.count = 0        # Bars currently in the window
+        self.position = 0     # Ring buffer slot of the next bar
+        self.updates = 0
+        self.last_close = {}  # pair -> close of the previous bar
+
+    def update(self, returns, observed=None):
+        """
+        Add one bar of returns (aligned with self.pairs), evicting the oldest bar once the window is full.
+        """
+        returns = np.asarray(returns, dtype=float)
+        observed = np.ones(len(returns), dtype=bool) if observed is None else np.asarray(observed, dtype=bool)
+        old = self.buffer[self.position]
+
+        self.sums += returns - old
+        # Rank-2 update r·rᵀ - old·oldᵀ as one (n×2)·(2×n) product: a single n×n temporary
+        self.products += np.column_stack((returns, old)) @ np.vstack((returns, -old))
+        self.observations += observed.astype(int) - self.observed[self.position]
+
+        self.buffer[self.position] = returns
+        self.observed[self.position] = observed
+        self.position = (self.position + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        self.updates += 1
+        if self.updates % self.resync_interval == 0:
+            self.resync()
+
+    def update_closes(self, closes):
+        """
+        Add one bar from closing prices (pair -> close); returns are taken against the previous bar's closes.
+        """
+        returns = np.zeros(len(self.pairs))
+        observed = np.zeros(len(self.pairs), dtype=bool)
+        for pair in [pair for pair in self.last_close if not closes.get(pair)]:
+            del self.last_close[pair]  # The next close is two bars away from this one
+        for pair, close in closes.items():
+            i = self.index.get(pair)
+            if i is None or not close or close <= 0:
+                continue
+            previous = self.last_close.get(pair)
+            if previous:
+                returns[i] = np.log(close / previous)
+                observed[i] = True
+            self.last_close[pair] = close
+        self.update(returns, observed)
+
+    def resync(self):
+        self.sums = self.buffer.sum(axis=0)
+        self.products = self.buffer.T @ self.buffer
+
+    def covariance(self, pairs=None):
+        """
+        Sample covariance matrix for `pairs` (default: the whole universe), or None before two bars.
+        """
+        if self.count < 2:
+            return None
+        ix = np.arange(len(self.pairs)) if pairs is None else np.array([self.index[pair] for pair in pairs], dtype=int)
+        sums = self.sums[ix]
+        return (self.products[np.ix_(ix, ix)] - np.outer(sums, sums) / self.count) / (self.count - 1)
+
+    def correlation(self, pairs=None):
+        cov = self.covariance(pairs)
+        if cov is None:
+            return None
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        return np.nan_to_num(corr)
+
+    def set_universe(self, pairs):
+        """
+        Keep the history of pairs that stay in the universe; new pairs start without observations.
+        """
+        pairs = list(pairs)
+        if pairs == self.pairs:
+            return
+        kept = [(new, self.index[pair]) for new, pair in enumerate(pairs) if pair in self.index]
+        buffer = np.zeros((self.window, len(pairs)))
+        observed = np.zeros((self.window, len(pairs)), dtype=bool)
+        for new, old in kept:
+            buffer[:, new] = self.buffer[:, old]
+            observed[:, new] = self.observed[:, old]
+        self.pairs = pairs
+        self.index = {pair: i for i, pair in enumerate(pairs)}
+        self.buffer = buffer
+        self.observed = observed
+        self.observations = observed.sum(axis=0)
+        self.last_close = {pair: close for pair, close in self.last_close.items() if pair in self.index}
+        self.resync()
+
+
+def allocate(confidences, covariance=None, observations=None, shrinkage=None, min_observations=None):
+    """
+    Split capital across simultaneous buy signals.
+
+    Weights are proportional to Σ⁻¹·c, where c are the buy confidences and Σ the return
+    covariance shrunk towards its diagonal, so correlated signals share one allocation
+    instead of doubling the same bet. Weights are long-only and sum to 1. Pairs with
+    too few observations are treated as uncorrelated with the average variance; without
+    a covariance estimate, weights are proportional to confidence.
+
+    Parameters:
+        confidences (dict): Pair -> buy confidence, in a fixed order.
+        covariance (np.ndarray, optional): Covariance matrix aligned with `confidences`.
+        observations (np.ndarray, optional): Observed bars per pair, aligned with `confidences`.
+
+    Returns:
+        dict: Pair -> fraction of the available capital.
+    """
+    pairs = list(confidences)
+    if not pairs:
+        return {}
+    signal = np.array([max(confidences[pair], 0.0) for pair in pairs])
+    if len(pairs) == 1:
+        return {pairs[0]: 1.0}
+    if signal.sum() <= 0:
+        signal = np.ones(len(pairs))
+    if covariance is None:
+        return dict(zip(pairs, (signal / signal.sum()).tolist()))
+
+    shrinkage = shrinkage if shrinkage is not None else settings.PORTFOLIO_SHRINKAGE
+    min_observations = min_observations or settings.PORTFOLIO_MIN_OBSERVATIONS
+    cov = np.array(covariance, dtype=float)
+    known = np.ones(len(pairs), dtype=bool) if observations is None else np.asarray(observations) >= min_observations
+    known &= np.diag(cov) > 0
+    if not known.any():
+        return dict(zip(pairs, (signal / signal.sum()).tolist()))
+
+    # Thinly observed pairs: no correlation, average variance of the well observed ones
+    average_variance = np.diag(cov)[known].mean()
+    cov[~known, :] = 0.0
+    cov[:, ~known] = 0.0
+    cov[~known, ~known] = average_variance
+
+    shrunk = (1 - shrinkage) * cov + shrinkage * np.diag(np.diag(cov))
+    try:
+        weights = np.linalg.solve(shrunk, signal)
+    except np.linalg.LinAlgError:
+        weights = np.linalg.pinv(shrunk) @ signal
+    weights = np.clip(weights, 0.0, None)
+    if not np.isfinite(weights).all() or weights.sum() <= 0:
+        weights = signal
+    return dict(zip(pairs, (weights / weights.sum()).tolist()))
+
+
+class PortfolioAllocator:
+    """
+    Maintain the rolling return covariance of the active universe from the candle
+    caches and size allocations across buy signals that fire together.
+    """
+
+    def __init__(self, pairs, timeframe=None, window=None, max_lag_bars=None):
+        self.timeframe = timeframe or settings.PORTFOLIO_TIMEFRAME
+        self.step = timeframe_to_ms(self.timeframe)
+        self.max_lag_bars = max_lag_bars if max_lag_bars is not None else settings.PORTFOLIO_MAX_LAG_BARS
+        self.covariance = RollingCovariance(pairs, window)
+        self.last_bar = None  # Open time (ms) of the last bar added
+        self.seeded = set()   # Pairs whose window history came from their candle cache
+
+    def set_universe(self, pairs):
+        self.covariance.set_universe(pairs)
+        self.seeded &= set(pairs)
+
+    def update_from_candles(self, candles, latest_bar):
+        """
+        Add every bar closed since the last update, up to the bar opening at `latest_bar`.
+
+        Bars are only added once every cache has them: a cache up to max_lag_bars behind
+        `latest_bar` (its stream is late or a backfill is pending) holds the update back to
+        its newest bar, so a late bar is never recorded as a missing close. Caches further
+        behind are treated as stale and contribute no returns.
+
+        Pairs whose candle cache appears after the first update get their window history
+        filled in from the cache, followed by a single resync.
+
+        Parameters:
+            candles (dict): (pair, timeframe) -> OHLCV rows, as cached by the market-data feed.
+            latest_bar (int): Open time (ms) of the latest closed bar.
+
+        Returns:
+            int: Number of bars added.
+        """
+        available = [pair for pair in self.covariance.pairs if candles.get((pair, self.timeframe))]
+        for pair in available:
+            newest = candles[(pair, self.timeframe)][-1][0]
+            if latest_bar - self.max_lag_bars * self.step <= newest < latest_bar:
+                latest_bar = newest
+        if self.last_bar is not None and latest_bar <= self.last_bar:
+            return 0
+        if self.last_bar is not None:
+            self._seed([pair for pair in available if pair not in self.seeded], candles)
+
+        window_start = latest_bar - self.covariance.window * self.step
+        if self.last_bar is not None and self.last_bar >= window_start:
+            first_bar = self.last_bar + self.step
+        else:
+            # First update or a gap longer than the window: restart returns from the window start
+            first_bar = window_start + self.step
+            self.covariance.last_close = {}
+
+        closes_by_pair = {}
+        for pair in available:
+            # Rows are sorted by open time: only the few bars being added are read, not the whole cache
+            rows = candles[(pair, self.timeframe)]
+            start = bisect.bisect_left(rows, first_bar - self.step, key=lambda row: row[0])
+            closes_by_pair[pair] = {}
+            for row in itertools.islice(rows, start, None):
+                if row[0] > latest_bar:
+                    break
+                closes_by_pair[pair][row[0]] = row[4]
+            if not self.covariance.last_close.get(pair):
+                previous = closes_by_pair[pair].get(first_bar - self.step)
+                if previous:
+                    self.covariance.last_close[pair] = previous
+            self.seeded.add(pair)
+
+        added = 0
+        for bar in range(first_bar, latest_bar + 1, self.step):
+            self.covariance.update_closes({pair: closes[bar] for pair, closes in closes_by_pair.items() if bar in closes})
+            added += 1
+        self.last_bar = latest_bar
+        return added
+
+    def _seed(self, pairs, candles):
+        """
+        Fill in the window history of pairs whose candle cache just became available.
+        """
+        if not pairs:
+            return
+        rolling = self.covariance
+        for pair in pairs:
+            closes = {row[0]: row[4] for row in candles[(pair, self.timeframe)]}
+            i = rolling.index[pair]
+            for age in range(rolling.count):
+                bar = self.last_bar - age * self.step
+                close, previous = closes.get(bar), closes.get(bar - self.step)
+                if close and previous:
+                    slot = (rolling.position - 1 - age) % rolling.window
+                    rolling.buffer[slot, i] = np.log(close / previous)
+                    rolling.observed[slot, i] = True
+            if closes.get(self.last_bar):
+                rolling.last_close[pair] = closes[self.last_bar]
+            self.seeded.add(pair)
+        rolling.observations = rolling.observed.sum(axis=0)
+        rolling.resync()
+
+    def allocate(self, confidences):
+        """
+        Fractions of the available capital for each pair in `confidences` (pair -> buy confidence).
+        """
+        tracked = [pair for pair in confidences if pair in self.covariance.index]
+        if len(tracked) != len(confidences):
+            return allocate(confidences)
+        covariance = self.covariance.covariance(tracked)
+        observations = self.covariance.observations[[self.covariance.index[pair] for pair in tracked]]
+        allocations = allocate(confidences, covariance, observations)
+        if len(allocations) > 1:
+            logger.info("Allocations across simultaneous buy signals: " +
+                        ", ".join(f"{pair} {fraction:.1%}" for pair, fraction in allocations.items()))
+        return allocations
+
+
+def benchmark(n_pairs=500, window=288, bars=200, seed=0):
+    """
+    Time the incremental covariance update against a full recompute from the window.
+
+    Returns:
+        dict: Mean seconds per bar for 'incremental' and 'recompute'.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_normal((window + bars, n_pairs)) * 0.01
+    rolling = RollingCovariance([f"P{i}/USDT" for i in range(n_pairs)], window=window, resync_interval=10 ** 9)
+    for row in returns[:window]:
+        rolling.update(row)
+
+    started = time.perf_counter()
+    for row in returns[window:]:
+        rolling.update(row)
+    incremental = (time.perf_counter() - started) / bars
+
+    recompute_bars = min(bars, 20)
+    started = time.perf_counter()
+    for end in range(window, window + recompute_bars):
+        np.cov(returns[end - window + 1:end + 1], rowvar=False)
+    recompute = (time.perf_counter() - started) / recompute_bars
+    return {'incremental': incremental, 'recompute': recompute}
+
+
+if __name__ == "__main__":
+    results = benchmark()
+    print(f"500 pairs, 288-bar window: incremental update {results['incremental'] * 1000:.2f}ms/bar, "
+          f"full recompute {results['recompute'] * 1000:.2f}ms/bar "
+          f"({results['recompute'] / results['incremental']:.1f}x)")
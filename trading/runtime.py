@@ -0,0 +1,197 @@
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import multiprocessing
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_cpu_executor = None
+_profiling = False  # While a sweep is profiled, CPU stages run inline so they appear in the profile
+
+
+def _configure_worker_logging():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(processName)s %(message)s')
+
+
+def cpu_executor():
+    """
+    Return the executor for CPU-heavy stages (CPU_EXECUTOR), creating it on first use.
+
+    "thread" keeps data in-process and only frees the loop between GIL switches;
+    "process" runs stages in parallel at the cost of pickling their inputs and results;
+    "inline" (or None) runs them on the event loop as before.
+    """
+    global _cpu_executor
+    if _cpu_executor is None:
+        if settings.CPU_EXECUTOR == 'thread':
+            _cpu_executor = ThreadPoolExecutor(max_workers=settings.CPU_WORKERS, thread_name_prefix='cpu')
+        elif settings.CPU_EXECUTOR == 'process':
+            # Spawned workers only import what the submitted functions need, never the trader
+            _cpu_executor = ProcessPoolExecutor(max_workers=settings.CPU_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=_configure_worker_logging)
+    return _cpu_executor
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Run a CPU-bound function off the event loop on the configured executor.
+
+    With a process executor `func` must be a module-level function and its arguments picklable.
+    During a profiled sweep the stage runs inline, since cProfile only sees the loop thread.
+    """
+    executor = None if _profiling else cpu_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_cpu_executor():
+    global _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+
+
+class LoopLagMonitor:
+    """
+    Measure event-loop delay and report callbacks that block the loop.
+
+    A coroutine wakes every `interval` seconds and records how late it was scheduled.
+    A watchdog thread watches that heartbeat; when the loop has not come back for longer
+    than `threshold`, it logs the loop thread's current stack, which points at the
+    blocking callback while it is still running.
+    """
+
+    def __init__(self, interval=None, threshold=None):
+        self.interval = interval or settings.LOOP_LAG_CHECK_INTERVAL
+        self.threshold = threshold or settings.LOOP_BLOCK_THRESHOLD
+        self.lags = deque(maxlen=1000)  # Seconds
+        self.stalls = 0
+        self._heartbeat = None
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.threshold or reported == heartbeat:
+                continue
+            reported = heartbeat  # One report per stall
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<no frame>'
+            logger.warning(f"Event loop blocked for {blocked_for * 1000:.0f}ms; loop thread stack:\n{stack}")
+
+    def log_stats(self):
+        if not self.lags:
+            return
+        p50, p95 = np.percentile(list(self.lags), [50, 95])
+        logger.info(f"Event loop lag: p50 {p50 * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms, "
+                    f"max {max(self.lags) * 1000:.1f}ms, {self.stalls} stalls over {self.threshold * 1000:.0f}ms")
+
+
+class SweepProfiler:
+    """
+    On-demand cProfile dump of a single scan sweep.
+
+    A profile is requested with SIGUSR1 or by creating PROFILE_FLAG_FILE; the next sweep
+    is profiled, its stats written to PROFILE_DIR and the top entries logged. CPU stages
+    submitted through run_cpu run inline on the loop thread during that sweep, so the
+    profile covers them (at the cost of one slower sweep).
+    """
+
+    def __init__(self, profile_dir=None, flag_file=None):
+        self.profile_dir = profile_dir or settings.PROFILE_DIR
+        self.flag_file = flag_file or settings.PROFILE_FLAG_FILE
+        self.requested = False
+        self._profile = None
+
+    def install_signal_handler(self):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.request)
+        except (NotImplementedError, AttributeError, RuntimeError):
+            logger.info(f"SIGUSR1 profiling unavailable; create {self.flag_file} to profile a sweep.")
+
+    def request(self):
+        self.requested = True
+
+    def begin(self):
+        global _profiling
+        if os.path.exists(self.flag_file):
+            os.remove(self.flag_file)
+            self.requested = True
+        if self.requested and self._profile is None:
+            self.requested = False
+            _profiling = True
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def end(self):
+        """
+        Stop a running sweep profile and dump it.
+
+        Returns:
+            str: Path of the written .prof file, or None when no sweep was profiled.
+        """
+        global _profiling
+        if self._profile is None:
+            return None
+        profile, self._profile = self._profile, None
+        profile.disable()
+        _profiling = False
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"sweep-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        profile.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(20)
+        logger.info(f"Sweep profile written to {path}:\n{summary.getvalue()}")
+        return path
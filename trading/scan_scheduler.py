@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+import numpy as np
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def pair_activity(df, bars=60):
+    """
+    Recent volatility (std of close-to-close returns) and quote volume of a candle frame.
+    """
+    recent = df.tail(bars + 1)
+    returns = recent['close'].pct_change().dropna()
+    volatility = float(returns.std()) if len(returns) > 1 else 0.0
+    volume = float((recent['close'] * recent['volume']).tail(bars).sum())
+    return volatility, volume
+
+
+def _percentile_ranks(values):
+    """
+    Map each key to its percentile rank (0..1) among all values.
+    """
+    if len(values) < 2:
+        return {key: 0.5 for key in values}
+    order = sorted(values, key=values.get)
+    return {key: rank / (len(order) - 1) for rank, key in enumerate(order)}
+
+
+class ScanScheduler:
+    """
+    Priority scan scheduling across the trading universe.
+
+    Pairs sit in a heap keyed by their next due time. After each evaluation a pair's
+    priority is derived from its recent volatility and volume (ranked against the rest
+    of the universe) and how close its buy confidence came to BUY_CONFIDENCE_THRESHOLD.
+    Hot pairs get short rescan intervals and cold pairs long ones, while a token bucket
+    keeps the REST requests spent on scans within a global per-minute budget.
+    """
+
+    def __init__(self, pairs, min_interval=None, max_interval=None, request_budget=None,
+                 requests_per_scan=None, clock=time.monotonic):
+        self.min_interval = min_interval or settings.SCAN_MIN_INTERVAL
+        self.max_interval = max_interval or settings.SCAN_MAX_INTERVAL
+        self.request_budget = request_budget or settings.SCAN_REQUEST_BUDGET  # Requests per minute
+        self.weights = settings.SCAN_PRIORITY_WEIGHTS
+        self.clock = clock
+
+        self.pairs = set()
+        self.metrics = {}    # pair -> {'volatility', 'volume', 'proximity', 'priority'}
+        self.intervals = {}  # pair -> current rescan interval in seconds
+        self.last_scan = {}  # pair -> clock time of the last evaluation
+        self.detection_latencies = deque(maxlen=1000)  # Seconds from the close of the first unevaluated bar to its evaluation
+        self.signal_latencies = deque(maxlen=200)      # Same, for evaluations that produced a buy signal
+        self.scans = 0
+
+        self._heap = []
+        self._due = {}  # pair -> due time of its live heap entry
+        self._sequence = itertools.count()
+        self._tokens = float(self.request_budget)
+        self._token_time = clock()
+        self._cost_per_scan = float(requests_per_scan or len(settings.TIMEFRAMES) + 1)
+        self._last_report = clock()
+        self.set_universe(pairs)
+
+    def set_universe(self, pairs):
+        pairs = set(pairs)
+        now = self.clock()
+        for pair in pairs - self.pairs:
+            self.intervals[pair] = self.min_interval
+            self._push(pair, now)  # New pairs are scanned right away
+        for pair in self.pairs - pairs:
+            self._due.pop(pair, None)
+            self.metrics.pop(pair, None)
+            self.intervals.pop(pair, None)
+            self.last_scan.pop(pair, None)
+        self.pairs = pairs
+
+    def _push(self, pair, due):
+        self._due[pair] = due
+        heapq.heappush(self._heap, (due, next(self._sequence), pair))
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(float(self.request_budget), self._tokens + (now - self._token_time) * self.request_budget / 60)
+        self._token_time = now
+
+    async def next_pair(self):
+        """
+        Wait until the most urgent pair is due and the request budget allows a scan, then return it.
+        """
+        while True:
+            if not self._heap:
+                await asyncio.sleep(1)
+                continue
+            due, _, pair = self._heap[0]
+            if self._due.get(pair) != due:
+                heapq.heappop(self._heap)  # Stale entry for a rescheduled or removed pair
+                continue
+            now = self.clock()
+            if due > now:
+                await asyncio.sleep(min(due - now, 1))
+                continue
+            self._refill()
+            if self._tokens < self._cost_per_scan:
+                await asyncio.sleep((self._cost_per_scan - self._tokens) * 60 / self.request_budget)
+                continue
+            heapq.heappop(self._heap)
+            del self._due[pair]
+            return pair
+
+    async def next_batch(self, max_size):
+        """
+        Return the next due pair plus any other pairs already due, as far as the budget allows.
+        """
+        batch = [await self.next_pair()]
+        now = self.clock()
+        self._refill()
+        tokens = self._tokens - self._cost_per_scan
+        while len(batch) < max_size and self._heap:
+            due, _, pair = self._heap[0]
+            if self._due.get(pair) != due:
+                heapq.heappop(self._heap)
+                continue
+            if due > now or tokens < self._cost_per_scan:
+                break
+            heapq.heappop(self._heap)
+            del self._due[pair]
+            batch.append(pair)
+            tokens -= self._cost_per_scan
+        return batch
+
+    def skip(self, pair, delay=None):
+        """
+        Reschedule a pair that was due but had nothing new to evaluate; no requests are charged.
+        Pairs that are already scheduled keep their slot.
+        """
+        if pair in self.pairs and pair not in self._due:
+            self._push(pair, self.clock() + (delay if delay is not None else self.intervals[pair]))
+
+    def record(self, pair, volatility, volume, buy_confidence, requests=None, signal=None, bar_close_ms=None):
+        """
+        Update a pair's priority after an evaluation and schedule its next scan.
+        """
+        if pair not in self.pairs:
+            return
+        now = self.clock()
+        self.scans += 1
+        self.last_scan[pair] = now
+
+        cost = self._cost_per_scan if requests is None else requests
+        self._refill()
+        self._tokens -= cost
+        self._cost_per_scan = 0.9 * self._cost_per_scan + 0.1 * max(cost, 0.1)
+
+        if bar_close_ms is not None:
+            latency = max(0.0, time.time() - bar_close_ms / 1000)
+            self.detection_latencies.append(latency)
+            if signal == 'buy':
+                self.signal_latencies.append(latency)
+
+        proximity = min(max(buy_confidence / settings.BUY_CONFIDENCE_THRESHOLD, 0.0), 1.0)
+        self.metrics[pair] = {'volatility': volatility, 'volume': volume, 'proximity': proximity}
+        self._reprioritize()
+        self._push(pair, now + self.intervals[pair])
+
+    def _reprioritize(self):
+        volatility_ranks = _percentile_ranks({pair: m['volatility'] for pair, m in self.metrics.items()})
+        volume_ranks = _percentile_ranks({pair: m['volume'] for pair, m in self.metrics.items()})
+        ratio = self.max_interval / self.min_interval
+        intervals = {pair: self.min_interval for pair in self.pairs}  # Unmeasured pairs stay hot
+        for pair, metrics in self.metrics.items():
+            priority = (self.weights['volatility'] * volatility_ranks[pair]
+                        + self.weights['volume'] * volume_ranks[pair]
+                        + self.weights['proximity'] * metrics['proximity'])
+            metrics['priority'] = priority
+            intervals[pair] = self.min_interval * ratio ** (1 - priority)
+
+        # Stretch every interval evenly if the planned scan rate would exceed the request budget
+        planned = sum(self._cost_per_scan * 60 / interval for interval in intervals.values())
+        scale = max(1.0, planned / self.request_budget)
+        self.intervals = {pair: interval * scale for pair, interval in intervals.items()}
+
+    def report_due(self):
+        return self.clock() - self._last_report >= settings.SCAN_REPORT_INTERVAL
+
+    def log_report(self):
+        self._last_report = self.clock()
+        logger.info(f"=== Scan Scheduler: {self.scans} scans, {len(self.pairs)} pairs, "
+                    f"~{self._cost_per_scan:.2f} requests/scan, budget {self.request_budget}/min ===")
+        for pair in sorted(self.intervals, key=self.intervals.get):
+            priority = self.metrics.get(pair, {}).get('priority')
+            priority_text = f"{priority:.2f}" if priority is not None else "n/a"
+            logger.info(f"  - {pair}: interval {self.intervals[pair]:.0f}s, priority {priority_text}")
+        for label, latencies in (('Detection latency', self.detection_latencies), ('Buy signal latency', self.signal_latencies)):
+            if latencies:
+                p50, p95 = np.percentile(list(latencies), [50, 95])
+                logger.info(f"{label}: p50 {p50:.1f}s, p95 {p95:.1f}s over {len(latencies)} evaluations")
@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import pickle
+import time
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+def _fsync_directory(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    """
+    Write bytes so that `path` holds either the previous or the new content, never a torn file.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(data)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(path)
+
+
+class StateJournal:
+    """
+    Append-only, fsynced JSONL journal of positions and order events.
+
+    Every record is flushed to disk before the call returns, so a crash at any point
+    leaves a journal that replays to the last acknowledged state: open positions with
+    their ratcheted take-profit, and orders that were submitted but never resolved
+    (those are looked up by client order ID after a restart).
+
+    An order_submitted record can carry the position it was placed for as `intent`:
+    {'action': 'open', 'pair', 'take_profit', 'stop_loss'} or {'action': 'close', 'pair',
+    'reason', 'min_amount'}. Its order_filled record then opens or reduces/closes that
+    position in the same write, so no crash window separates a fill from the position it
+    belongs to.
+
+    Events:
+        position_open / position_update / position_close (keyed by pair)
+        order_submitted / order_filled / order_failed (keyed by client_order_id)
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.STATE_JOURNAL_PATH
+        self.positions = {}  # pair -> position state
+        self.pending = {}    # client order ID -> order_submitted record
+        self._file = None
+        self._replay()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as journal_file:
+            for line_number, line in enumerate(journal_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Only the final record can be torn by a crash mid-write
+                    logger.warning(f"Skipping unreadable state journal record at line {line_number}.")
+                    continue
+                self._apply(record)
+        logger.info(f"State journal replayed: {len(self.positions)} open position(s), "
+                    f"{len(self.pending)} unresolved order(s).")
+
+    def _apply(self, record):
+        event = record.get('event')
+        fields = {key: value for key, value in record.items() if key not in ('event', 'ts')}
+        if event == 'position_open':
+            self.positions[record['pair']] = fields
+        elif event == 'position_update' and record['pair'] in self.positions:
+            self.positions[record['pair']].update(fields)
+        elif event == 'position_close':
+            self.positions.pop(record['pair'], None)
+        elif event == 'order_submitted':
+            self.pending[record['client_order_id']] = fields
+        elif event == 'order_filled':
+            order = self.pending.pop(record['client_order_id'], None)
+            if order and order.get('intent'):
+                self._apply_fill(order['intent'], record)
+        elif event == 'order_failed':
+            self.pending.pop(record['client_order_id'], None)
+
+    def _apply_fill(self, intent, fill):
+        pair = intent['pair']
+        if not fill.get('filled'):
+            return
+        if intent['action'] == 'open':
+            buy_price = fill.get('average') or (fill.get('cost') or 0) / fill['filled']
+            if not buy_price:
+                return
+            self.positions[pair] = {
+                'pair': pair,
+                'amount': fill.get('net_filled', fill['filled']),
+                'buy_price': buy_price,
+                'profit_percentage': intent['take_profit'],
+                'take_profit_price': buy_price * (1 + intent['take_profit']),
+                'stop_loss_price': buy_price * (1 - intent['stop_loss']),
+                'ratcheted_at_ms': None,
+            }
+        elif intent['action'] == 'close' and pair in self.positions:
+            # A partial exit keeps the rest of the holding; a remainder below the lot minimum can't be sold
+            remaining = self.positions[pair]['amount'] - fill['filled']
+            if remaining <= 0 or remaining < (intent.get('min_amount') or 0):
+                self.positions.pop(pair)
+            else:
+                self.positions[pair]['amount'] = remaining
+
+    def append(self, event, **fields):
+        record = {'event': event, 'ts': time.time(), **fields}
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, default=str) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._apply(record)
+        return record
+
+    def compact(self):
+        """
+        Rewrite the journal as the minimal records reproducing the current state.
+        """
+        lines = [json.dumps({'event': 'position_open', 'ts': time.time(), **position}, default=str)
+                 for position in self.positions.values()]
+        lines += [json.dumps({'event': 'order_submitted', 'ts': time.time(), **order}, default=str)
+                  for order in self.pending.values()]
+        self.close()
+        atomic_write(self.path, ''.join(line + '\n' for line in lines).encode('utf-8'))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def encode_snapshot(candles):
+    """
+    Serialize the candle caches into snapshot bytes.
+
+    Each cache is copied and pickled on its own. On a worker thread this releases the GIL
+    between caches instead of holding it for the whole snapshot, and since copying one
+    row list is atomic and rows are replaced rather than mutated, the event loop can keep
+    updating the caches meanwhile.
+
+    Parameters:
+        candles (dict or list): (pair, timeframe) -> OHLCV rows, or a list of its items.
+    """
+    items = candles.items() if isinstance(candles, dict) else candles
+    blobs = {key: pickle.dumps(list(rows), protocol=pickle.HIGHEST_PROTOCOL) for key, rows in items}
+    return pickle.dumps({'version': SNAPSHOT_VERSION, 'saved_at': time.time(), 'candles': blobs},
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def write_snapshot(path, candles):
+    """
+    Atomically persist the candle caches.
+    """
+    atomic_write(path, encode_snapshot(candles))
+
+
+def load_snapshot(path=None, max_age=None):
+    """
+    Load a candle snapshot written by write_snapshot.
+
+    Returns:
+        dict: {'version', 'saved_at', 'candles'}, or None when missing, unreadable or older than `max_age` seconds.
+    """
+    path = path or settings.STATE_SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
+    except Exception as e:
+        logger.error(f"Could not read state snapshot {path}: {e}")
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        logger.info(f"Ignoring state snapshot {path} with version {snapshot.get('version')}.")
+        return None
+    age = time.time() - snapshot['saved_at']
+    if max_age is not None and age > max_age:
+        logger.info(f"Ignoring state snapshot {path}: {age:.0f}s old.")
+        return None
+    snapshot['candles'] = {key: pickle.loads(blob) for key, blob in snapshot['candles'].items()}
+    return snapshot
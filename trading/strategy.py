@@ -6,6 +6,7 @@ from config.settings import (
     INDICATOR_WEIGHTS,
     BUY_CONFIDENCE_THRESHOLD,
     SELL_CONFIDENCE_THRESHOLD,
+    ML_BLEND_WEIGHT,
 )
 
 logger = logging.getLogger(__name__)
@@ -22,17 +23,69 @@ def simplified_evaluate_trading_signals(data, order_book):
     Returns:
         str: "buy", "sell", or "wait".
     """
+    return evaluate_signal_confidence(data, order_book)['signal']
 
-    total_weight = sum(TIMEFRAME_WEIGHTS.values())
-    TIMEFRAME_WEIGHTS_NORMALIZED = {k: v / total_weight for k, v in TIMEFRAME_WEIGHTS.items()}
+def evaluate_signal_confidence(data, order_book, ml_probability=None, timeframes=None, timeframe_weights=None,
+                               buy_threshold=None, sell_threshold=None):
+    """
+    Evaluate trading signals and return the aggregated confidences along with the signal.
 
-    signals = {}
-    aggregate_buy_confidence = 0
-    aggregate_sell_confidence = 0
+    Parameters:
+        data (dict): Dictionary where keys are timeframes and values are pandas DataFrames with OHLCV data.
+        order_book (dict): Order book data with 'bids' and 'asks'.
+        ml_probability (float, optional): Local model probability of an up move, blended into the confidences.
+        timeframes (list, optional): Timeframes to evaluate (default: TIMEFRAMES).
+        timeframe_weights (dict, optional): Weights per timeframe (default: TIMEFRAME_WEIGHTS).
+        buy_threshold, sell_threshold (float, optional): Signal thresholds (default: the configured thresholds).
+
+    Returns:
+        dict: {'signal', 'buy_confidence', 'sell_confidence', 'order_book_signal'}, with the
+        confidences after the ML blend.
+    """
+    timeframe_weights = timeframe_weights or TIMEFRAME_WEIGHTS
 
     logger.info("=== Starting Signal Evaluation ===")
 
-    for timeframe in TIMEFRAMES:
+    confidences = timeframe_confidences(data, timeframes or TIMEFRAMES)
+    avg_buy_confidence, avg_sell_confidence, signals = aggregate_confidences(confidences, timeframe_weights)
+
+    # Log aggregate confidence scores
+    log_signal_details(signals, avg_buy_confidence, avg_sell_confidence, timeframe_weights)
+
+    # Evaluate order book data
+    order_book_signal = analyze_order_book(order_book)
+
+    # Log order book analysis
+    logger.info(f"Order Book Signal: {'Strong Buy' if order_book_signal else 'No Buy Signal'}")
+
+    # Blend the model probability in before deciding, so the returned confidences are the ones the signal used
+    avg_buy_confidence, avg_sell_confidence = blend_ml_probability(avg_buy_confidence, avg_sell_confidence, ml_probability)
+
+    # Determine the final signal
+    signal = determine_final_signal(avg_buy_confidence, avg_sell_confidence, order_book_signal,
+                                    buy_threshold=buy_threshold, sell_threshold=sell_threshold)
+    logger.info(f"Final Determined Signal: {signal.upper()}")
+
+    return {
+        'signal': signal,
+        'buy_confidence': avg_buy_confidence,
+        'sell_confidence': avg_sell_confidence,
+        'order_book_signal': order_book_signal,
+    }
+
+def timeframe_confidences(data, timeframes):
+    """
+    Evaluate the buy and sell conditions of each timeframe, before any timeframe weighting.
+
+    Parameters:
+        data (dict): Dictionary where keys are timeframes and values are pandas DataFrames with OHLCV data.
+        timeframes (list): Timeframes to evaluate.
+
+    Returns:
+        dict: Timeframe -> {'raw_buy_confidence', 'raw_sell_confidence'}.
+    """
+    confidences = {}
+    for timeframe in timeframes:
         if timeframe not in data:
             logger.info(f"No data available for {timeframe}")
             continue
@@ -56,13 +109,34 @@ def simplified_evaluate_trading_signals(data, order_book):
         sell_conditions = define_conditions(latest, previous, mode="sell")
 
         # Evaluate conditions
-        buy_confidence = evaluate_conditions(buy_conditions, INDICATOR_WEIGHTS)
-        sell_confidence = evaluate_conditions(sell_conditions, INDICATOR_WEIGHTS)
+        confidences[timeframe] = {
+            'raw_buy_confidence': evaluate_conditions(buy_conditions, INDICATOR_WEIGHTS),
+            'raw_sell_confidence': evaluate_conditions(sell_conditions, INDICATOR_WEIGHTS),
+        }
+    return confidences
 
+def aggregate_confidences(confidences, timeframe_weights):
+    """
+    Combine per-timeframe confidences using normalized timeframe weights.
+
+    Parameters:
+        confidences (dict): Output of timeframe_confidences; timeframes without weights count with weight 1.0.
+        timeframe_weights (dict): Weights per timeframe.
+
+    Returns:
+        tuple: (aggregate buy confidence, aggregate sell confidence, per-timeframe signal details).
+    """
+    total_weight = sum(timeframe_weights.values())
+    timeframe_weights_normalized = {k: v / total_weight for k, v in timeframe_weights.items()}
+
+    signals = {}
+    aggregate_buy_confidence = 0
+    aggregate_sell_confidence = 0
+    for timeframe, confidence in confidences.items():
         # Apply timeframe weight
-        timeframe_weight = TIMEFRAME_WEIGHTS_NORMALIZED.get(timeframe, 1.0)
-        weighted_buy_confidence = buy_confidence * timeframe_weight
-        weighted_sell_confidence = sell_confidence * timeframe_weight
+        timeframe_weight = timeframe_weights_normalized.get(timeframe, 1.0)
+        weighted_buy_confidence = confidence['raw_buy_confidence'] * timeframe_weight
+        weighted_sell_confidence = confidence['raw_sell_confidence'] * timeframe_weight
 
         # Aggregate confidences
         aggregate_buy_confidence += weighted_buy_confidence
@@ -72,27 +146,9 @@ def simplified_evaluate_trading_signals(data, order_book):
         signals[timeframe] = {
             'buy_confidence': weighted_buy_confidence,
             'sell_confidence': weighted_sell_confidence,
-            'raw_buy_confidence': buy_confidence,
-            'raw_sell_confidence': sell_confidence,
+            **confidence,
         }
-
-    # Log aggregate confidence scores
-    log_signal_details(signals, aggregate_buy_confidence, aggregate_sell_confidence)
-
-    avg_buy_confidence = aggregate_buy_confidence
-    avg_sell_confidence = aggregate_sell_confidence
-
-    # Evaluate order book data
-    order_book_signal = analyze_order_book(order_book)
-
-    # Log order book analysis
-    logger.info(f"Order Book Signal: {'Strong Buy' if order_book_signal else 'No Buy Signal'}")
-
-    # Determine the final signal
-    signal = determine_final_signal(avg_buy_confidence, avg_sell_confidence, order_book_signal)
-    logger.info(f"Final Determined Signal: {signal.upper()}")
-
-    return signal
+    return aggregate_buy_confidence, aggregate_sell_confidence, signals
 
 def define_conditions(latest, previous, mode="buy"):
     """
@@ -187,7 +243,7 @@ def analyze_order_book(order_book):
     return imbalance_ratio > 0.6 and top_bid_volume > top_ask_volume
 
 
-def log_signal_details(signals, aggregate_buy_confidence, aggregate_sell_confidence):
+def log_signal_details(signals, aggregate_buy_confidence, aggregate_sell_confidence, timeframe_weights=None):
     """
     Log detailed signal confidence for each timeframe and aggregate results.
 
@@ -195,7 +251,9 @@ def log_signal_details(signals, aggregate_buy_confidence, aggregate_sell_confide
         signals (dict): Signals with confidence scores per timeframe.
         aggregate_buy_confidence (float): Aggregate buy confidence.
         aggregate_sell_confidence (float): Aggregate sell confidence.
+        timeframe_weights (dict, optional): Weights used for the aggregation (default: TIMEFRAME_WEIGHTS).
     """
+    timeframe_weights = timeframe_weights or TIMEFRAME_WEIGHTS
     logger.info("\n=== Signal Details by Timeframe ===")
     for timeframe, details in signals.items():
         logger.info(f"Timeframe: {timeframe}")
@@ -207,12 +265,27 @@ def log_signal_details(signals, aggregate_buy_confidence, aggregate_sell_confide
     logger.info(f"Total Aggregate Sell Confidence: {aggregate_sell_confidence:.4f}")
 
     logger.info("\n=== Timeframe Weights ===")
-    for timeframe, weight in TIMEFRAME_WEIGHTS.items():
-        normalized_weight = weight / sum(TIMEFRAME_WEIGHTS.values())
+    for timeframe, weight in timeframe_weights.items():
+        normalized_weight = weight / sum(timeframe_weights.values())
         logger.info(f"Timeframe: {timeframe}, Weight: {weight:.4f}, Normalized: {normalized_weight:.4f}")
 
 
-def determine_final_signal(avg_buy_confidence, avg_sell_confidence, order_book_signal):
+def blend_ml_probability(avg_buy_confidence, avg_sell_confidence, ml_probability=None):
+    """
+    Blend a model probability of an up move into the buy and sell confidences with ML_BLEND_WEIGHT.
+
+    Returns:
+        tuple: (buy confidence, sell confidence), unchanged when `ml_probability` is None.
+    """
+    if ml_probability is None:
+        return avg_buy_confidence, avg_sell_confidence
+    logger.info(f"ML probability {ml_probability:.2f} blended into confidences with weight {ML_BLEND_WEIGHT:.2f}.")
+    return ((1 - ML_BLEND_WEIGHT) * avg_buy_confidence + ML_BLEND_WEIGHT * ml_probability,
+            (1 - ML_BLEND_WEIGHT) * avg_sell_confidence + ML_BLEND_WEIGHT * (1 - ml_probability))
+
+
+def determine_final_signal(avg_buy_confidence, avg_sell_confidence, order_book_signal,
+                           buy_threshold=None, sell_threshold=None):
     """
     Determine the final signal based on aggregated confidences and order book data.
 
@@ -220,14 +293,19 @@ def determine_final_signal(avg_buy_confidence, avg_sell_confidence, order_book_s
         avg_buy_confidence (float): Average buy confidence.
         avg_sell_confidence (float): Average sell confidence.
         order_book_signal (bool): Whether order book shows strong buying pressure.
+        buy_threshold (float, optional): Buy confidence threshold (default: BUY_CONFIDENCE_THRESHOLD).
+        sell_threshold (float, optional): Sell confidence threshold (default: SELL_CONFIDENCE_THRESHOLD).
 
     Returns:
         str: "buy", "sell", or "wait".
     """
-    if avg_buy_confidence >= BUY_CONFIDENCE_THRESHOLD:
+    buy_threshold = buy_threshold if buy_threshold is not None else BUY_CONFIDENCE_THRESHOLD
+    sell_threshold = sell_threshold if sell_threshold is not None else SELL_CONFIDENCE_THRESHOLD
+
+    if avg_buy_confidence >= buy_threshold:
         logger.info(f"Buy signal triggered with avg buy confidence: {avg_buy_confidence:.2f} and order book signal.")
         return "buy"
-    elif avg_sell_confidence >= SELL_CONFIDENCE_THRESHOLD:
+    elif avg_sell_confidence >= sell_threshold:
         logger.info(f"Sell signal triggered with avg sell confidence: {avg_sell_confidence:.2f}.")
         return "sell"
 
@@ -1,11 +1,22 @@
 import ccxt.async_support as ccxt
 import asyncio
 import logging
+import time
 import pandas as pd
 from config import settings
-from trading.strategy import simplified_evaluate_trading_signals
+from trading.strategy import evaluate_signal_confidence
+from trading.market_data import MarketDataFeed
+from trading.candle_scheduler import CandleCloseScheduler
+from trading.scan_scheduler import ScanScheduler, pair_activity
+from trading.execution import OrderExecutor, TERMINAL_STATUSES
+from trading.paper import PaperTradingEngine, shared_evaluation
+from trading.runtime import LoopLagMonitor, SweepProfiler, run_cpu, shutdown_cpu_executor
+from trading.state import StateJournal, write_snapshot, load_snapshot
+from trading.portfolio import PortfolioAllocator
 from notifications.telegram_bot import send_telegram_message
-from indicators.technical_indicators import calculate_indicators
+from network.transport import http_transport
+from ML.inference import LocalModelInference
+from indicators.technical_indicators import build_indicator_frame
 from indicators.calculate_indicator_score import calculate_indicator_score
 
 # Configure logging
@@ -20,43 +31,83 @@ exchange = ccxt.binance({
     'options': {'adjustForTimeDifference': True}
 })
 
+# Paper trading fans the shared data pipeline out to several simulated strategies
+paper_engine = PaperTradingEngine() if settings.PAPER_TRADING else None
+
+# Streaming market data shared by the candle fetchers and order book consumers
+feed_timeframes = paper_engine.feed_timeframes if paper_engine else None
+market_data = MarketDataFeed(exchange, timeframes=feed_timeframes) if settings.USE_WEBSOCKET_FEED else None
+
+# Signal and score evaluation only runs when a relevant candle has closed
+candle_scheduler = CandleCloseScheduler()
+
+# Journal of positions and order events, replayed on startup to resume open positions
+state_journal = StateJournal()
+
+# Order execution with local pre-validation and idempotent retries
+executor = OrderExecutor(exchange, journal=state_journal)
+
+# Local model scoring for the USE_ML path, batched across pairs
+ml_inference = LocalModelInference() if settings.USE_ML else None
+
+# Event-loop health: lag monitoring with blocking-callback stacks, on-demand sweep profiles
+loop_monitor = LoopLagMonitor()
+sweep_profiler = SweepProfiler()
+
 # Cache for balance
 balance_cache = {}
 
-async def get_tradeable_pairs(quote_currency):
+async def get_tradeable_pairs(quote_currency, reload=False):
     try:
-        await exchange.load_markets()
+        await exchange.load_markets(reload)
         tradeable_pairs = [symbol for symbol in exchange.symbols if quote_currency in symbol.split('/')]
         return tradeable_pairs
     except Exception as e:
         logger.error(f"Error loading markets: {e}")
         return []
 
+async def refresh_universe(pairs, scan_scheduler, portfolio):
+    """
+    Reload the quote-currency pairs and move the feed subscriptions, scan schedule and
+    return covariance over to the new universe when listings changed.
+
+    Returns:
+        list: The pairs traded from now on.
+    """
+    refreshed = await get_tradeable_pairs('USDT', reload=True)
+    if not refreshed or set(refreshed) == set(pairs):
+        return pairs
+    added, removed = set(refreshed) - set(pairs), set(pairs) - set(refreshed)
+    logger.info(f"Universe changed: {len(added)} pair(s) added, {len(removed)} removed.")
+    if market_data:
+        await market_data.set_universe(refreshed)
+    scan_scheduler.set_universe(refreshed)
+    portfolio.set_universe(refreshed)
+    return refreshed
+
 async def close_exchange():
+    if settings.FLATTEN_ON_SHUTDOWN and not paper_engine:
+        await flatten_positions()
+    await save_state_snapshot()
+    state_journal.close()
+    if market_data:
+        await market_data.stop()
     if hasattr(exchange, 'close'):
         await exchange.close()
-
-def preprocess_data(df):
-    required_columns = ['open', 'high', 'low', 'close', 'volume']
-    if not all(col in df.columns for col in required_columns):
-        raise ValueError("DataFrame must contain open, high, low, close, and volume columns")
-    df = df.ffill().bfill()
-    return df
+    await http_transport.close()
+    await loop_monitor.stop()
+    shutdown_cpu_executor()
 
 async def fetch_historical_prices(pair, timeframes=settings.TIMEFRAMES, limit=1000):
     data = {}
     try:
         for timeframe in timeframes:
-            ohlcv = await exchange.fetch_ohlcv(pair, timeframe=timeframe, limit=limit)
+            ohlcv = await fetch_ohlcv(pair, timeframe, limit)
             if not ohlcv:
                 logger.info(f"No data returned for {pair} in {timeframe} timeframe.")
                 continue
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            df = preprocess_data(df)
-            df = calculate_indicators(df)
-            data[timeframe] = df
+            # Frame construction and indicators run on the CPU executor, off the event loop
+            data[timeframe] = await run_cpu(build_indicator_frame, ohlcv)
         return data
     except Exception as e:
         logger.error(f"Error fetching historical prices for {pair}: {e}")
@@ -66,28 +117,48 @@ async def fetch_historical_prices_for_score(pair, timeframes=settings.TIMEFRAMES
     data = {}
     try:
         for timeframe in timeframes:
-            ohlcv = await exchange.fetch_ohlcv(pair, timeframe=timeframe, limit=limit)
+            ohlcv = await fetch_ohlcv(pair, timeframe, limit)
             if not ohlcv:
                 logger.info(f"No data returned for {pair} in {timeframe} timeframe.")
                 continue
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            df = preprocess_data(df)
-            df = calculate_indicators(df)
-            data[timeframe] = df
+            # Frame construction and indicators run on the CPU executor, off the event loop
+            data[timeframe] = await run_cpu(build_indicator_frame, ohlcv)
         return data
     except Exception as e:
         logger.error(f"Error fetching historical prices for {pair}: {e}")
         return data
 
+async def fetch_ohlcv(pair, timeframe, limit):
+    """
+    Fetch OHLCV rows from the websocket feed, falling back to REST when it is not live.
+    """
+    if market_data:
+        return await market_data.fetch_ohlcv(pair, timeframe, limit)
+    return await exchange.fetch_ohlcv(pair, timeframe=timeframe, limit=limit)
+
+async def fetch_ticker(pair):
+    if market_data:
+        return await market_data.fetch_ticker(pair)
+    return await exchange.fetch_ticker(pair)
+
 async def fetch_order_book(pair):
     try:
+        if market_data:
+            return await market_data.fetch_order_book(pair)
         return await exchange.fetch_order_book(pair)
     except Exception as e:
         logger.error(f"Error fetching order book for {pair}: {e}")
         return None
 
+async def fetch_scan_data(pair, timeframes=settings.TIMEFRAMES):
+    """
+    Fetch the candles and order book a scan of one pair needs.
+    """
+    historical_prices = await fetch_historical_prices(pair, timeframes)
+    if not historical_prices:
+        return None, None
+    return historical_prices, await fetch_order_book(pair)
+
 async def get_balance(currency):
     """
     Fetch balance with caching to reduce API calls.
@@ -108,50 +179,67 @@ async def get_balance(currency):
         logger.error(f"Error fetching balance for {currency}: {e}")
         return 0
 
-async def place_market_order(pair, side, amount):
+async def place_market_order(pair, side, amount, price=None, intent=None):
     """
-    Place a market order.
+    Place a market order, validated and rounded against the market filters.
+
+    `intent` is the position the order opens or closes; the journal applies it with the fill.
     """
     try:
         if amount <= 0:
             logger.error(f"Invalid amount for {side} order: {amount}")
             return None
-        if side == 'buy':
-            order = await exchange.create_market_buy_order(pair, amount)
-        elif side == 'sell':
-            order = await exchange.create_market_sell_order(pair, amount)
-        logger.info(f"Market {side} order placed for {pair}: {amount} units.")
-        await send_telegram_message(f"Market {side} order placed for {pair}: {amount} units.")
+        order = await executor.market_order(pair, side, amount, price, intent=intent)
+        if order is None:
+            return None
+        balance_cache.clear()  # Balances changed; don't size the next order from the cache
+        logger.info(f"Market {side} order placed for {pair}: {order.get('filled')} units.")
+        await send_telegram_message(f"Market {side} order placed for {pair}: {order.get('filled')} units.")
         return order
     except Exception as e:
         logger.error(f"Error placing {side} order for {pair}: {e}")
         await send_telegram_message(f"Error placing {side} order for {pair}: {e}")
         return None
-    
-async def convert_to_usdt(pair):
+
+async def place_market_buy(pair, quote_amount):
+    """
+    Place a market buy spending `quote_amount` USDT, so sizing never depends on a stale price.
+
+    The fill opens the position in the state journal before anything else is awaited.
+    """
+    try:
+        order = await executor.buy(pair, quote_amount, intent=open_intent(pair))
+        if order is None:
+            return None
+        balance_cache.clear()
+        logger.info(f"Market buy order placed for {pair}: {order.get('filled')} units at {order.get('average')}.")
+        await send_telegram_message(f"Market buy order placed for {pair}: {order.get('filled')} units at {order.get('average')}.")
+        return order
+    except Exception as e:
+        logger.error(f"Error placing buy order for {pair}: {e}")
+        await send_telegram_message(f"Error placing buy order for {pair}: {e}")
+        return None
+
+async def convert_to_usdt(pair, intent=None):
     try:
         asset = pair.split('/')[0]
+        balance_cache.pop(asset, None)
         asset_balance = await get_balance(asset)
-        if asset_balance > 0:
-            # Check if the exchange supports direct conversion to USDT
-            conversion_pair = f"{asset}/USDT"
-            market = await exchange.fetch_ticker(conversion_pair)
-            if market:
-                order_result = await place_market_order(conversion_pair, 'sell', asset_balance)
-                if order_result:
-                    logger.info(f"Converted {asset_balance} of {asset} to USDT")
-                    await send_telegram_message(f"Converted {asset_balance} of {asset} to USDT.")
-                    return order_result
-            else:
-                logger.info(f"Direct conversion pair {conversion_pair} not available. Selling manually.")
-                # If direct conversion is not available, sell the asset first
-                order_result = await place_market_order(pair, 'sell', asset_balance)
-                if order_result:
-                    await send_telegram_message(f"Sold {asset_balance} of {asset} manually. Converting to USDT.")
-                    await asyncio.sleep(2)  # Allow some time for the market to update
-                    return await convert_to_usdt(pair)
-        else:
+        if asset_balance <= 0:
             logger.info(f"No {asset} balance to convert to USDT")
+            return None
+
+        # Sell straight into USDT when that market exists, otherwise through the traded pair
+        await executor.ensure_markets()
+        conversion_pair = f"{asset}/USDT"
+        if conversion_pair not in exchange.markets:
+            logger.info(f"Direct conversion pair {conversion_pair} not available. Selling through {pair}.")
+            conversion_pair = pair
+        order_result = await place_market_order(conversion_pair, 'sell', asset_balance, intent=intent)
+        if order_result:
+            logger.info(f"Converted {order_result.get('filled')} of {asset} via {conversion_pair}")
+            await send_telegram_message(f"Converted {order_result.get('filled')} of {asset} via {conversion_pair}.")
+        return order_result
     except Exception as e:
         logger.error(f"An error occurred converting {pair} to USDT: {e}")
     return None
@@ -171,91 +259,331 @@ async def rate_limited_fetch(func, *args, **kwargs):
         return None
 
 
+def open_intent(pair):
+    """
+    Journal intent of a buy: its fill opens a position with the initial take-profit and stop-loss.
+    """
+    return {'action': 'open', 'pair': pair, 'take_profit': settings.TAKE_PROFIT_PERCENTAGE,
+            'stop_loss': settings.STOP_LOSS_PERCENTAGE}
+
+def close_intent(pair, reason):
+    """
+    Journal intent of a sell: its fill closes the position on `pair`.
+    """
+    return {'action': 'close', 'pair': pair, 'reason': reason}
+
+async def monitor_position(pair, position):
+    """
+    Dynamic profit-taking loop for one open position.
+
+    The take-profit is ratcheted by the indicator score once per closed scoring candle,
+    and every change is journaled so a restart resumes from the same levels. The loop
+    ends only once exit fills have removed the position from the journal; a failed or
+    partial exit is retried for what is still held.
+    """
+    buy_price = position['buy_price']
+    profit_percentage = position['profit_percentage']
+    take_profit_price = position['take_profit_price']
+    stop_loss_price = position['stop_loss_price']
+
+    while pair in state_journal.positions:
+        try:
+            # Fetch the latest current price
+            ticker = await rate_limited_fetch(fetch_ticker, pair)
+            current_price = ticker['last']  # Get the latest price from the ticker data
+
+            # Ratchet the take-profit only when a scoring candle has closed
+            if candle_scheduler.should_evaluate('score', pair, settings.TIMEFRAMES_FOR_SCORE):
+                historical_prices = await fetch_historical_prices_for_score(pair)
+                if historical_prices:
+                    profit_percentage += await run_cpu(calculate_indicator_score, historical_prices) * settings.PROFIT_STEP
+                    profit_percentage = min(profit_percentage, settings.MAX_PROFIT_PERCENTAGE)
+                    take_profit_price = buy_price * (1 + profit_percentage)
+                    state_journal.append('position_update', pair=pair, profit_percentage=profit_percentage,
+                                         take_profit_price=take_profit_price,
+                                         ratcheted_at_ms=int(candle_scheduler.clock() * 1000))
+                else:
+                    candle_scheduler.invalidate('score', pair)
+
+            logger.info(f"Current Price: {current_price:.2f}, Take-Profit: {take_profit_price:.2f}, Stop-Loss: {stop_loss_price:.2f}")
+
+            # Check if price hits take-profit or stop-loss levels
+            reason = None
+            if current_price >= take_profit_price:
+                logger.info(f"Take-Profit triggered! Selling at {current_price}")
+                reason = 'take_profit'
+            elif current_price <= stop_loss_price:
+                logger.info(f"Stop-Loss triggered! Selling at {current_price}")
+                reason = 'stop_loss'
+            if reason:
+                # Sell fills reduce or close the position in the journal together with the fill
+                amount = state_journal.positions[pair]['amount']
+                selling = await place_market_order(pair, 'sell', amount, current_price, intent=close_intent(pair, reason))
+                if not selling and pair in state_journal.positions:
+                    await convert_to_usdt(pair, intent=close_intent(pair, reason))
+                if pair not in state_journal.positions:
+                    break
+                logger.error(f"Exit for {pair} did not close the position; "
+                             f"{state_journal.positions[pair]['amount']} still held. Retrying.")
+
+            # Wait before the next iteration
+            await asyncio.sleep(20)
+        except Exception as e:
+            logger.error(f"Error fetching current price or processing trade logic: {e}")
+            await asyncio.sleep(20)  # Retry after a short delay
+
+async def buy_and_monitor(candidates, portfolio):
+    """
+    Split the USDT balance across simultaneous buy signals, buy them concurrently and
+    monitor the resulting positions until all are closed.
+
+    Parameters:
+        candidates (dict): Pair -> buy confidence.
+        portfolio (PortfolioAllocator): Rolling covariance used to size the allocations.
+    """
+    usdt_balance = await get_balance('USDT')
+    allocations = portfolio.allocate(candidates)
+    orders = await asyncio.gather(*(place_market_buy(pair, usdt_balance * fraction) for pair, fraction in allocations.items()))
+
+    positions = []
+    for pair, buy_order in zip(allocations, orders):
+        if not buy_order or pair not in state_journal.positions:
+            continue
+        position = dict(state_journal.positions[pair])  # Opened by the journaled fill
+        logger.info(f"Bought {pair} at {position['buy_price']}")
+        candle_scheduler.invalidate('score', pair)
+        positions.append(position)
+
+    if positions:
+        await asyncio.gather(*(monitor_position(position['pair'], position) for position in positions))
+        await asyncio.sleep(2)
+
+async def flatten_positions():
+    """
+    Sell every open position concurrently, e.g. on shutdown with FLATTEN_ON_SHUTDOWN.
+    """
+    positions = list(state_journal.positions.values())
+    if not positions:
+        return
+    logger.info(f"Flattening {len(positions)} open position(s).")
+    results = await executor.close_positions([(position['pair'], position['amount']) for position in positions],
+                                             reason='shutdown')
+    balance_cache.clear()
+    flattened = 0
+    for position, result in zip(positions, results):
+        if position['pair'] in state_journal.positions:  # Still open: the exit did not fill
+            logger.error(f"Could not flatten {position['pair']} position: {result}")
+        else:
+            flattened += 1
+    await send_telegram_message(f"Flattened {flattened} of {len(positions)} open position(s) on shutdown.")
+
+async def resolve_pending_orders():
+    """
+    Look up orders that were in flight when the process stopped and apply their outcome,
+    opening or closing the positions they were placed for.
+
+    An order that is still working is cancelled first, so its final fill is the one
+    recorded; if it can't be settled it stays pending for the next restart.
+    """
+    for client_order_id, order in list(state_journal.pending.items()):
+        pair, side = order['pair'], order['side']
+        try:
+            result = await executor.find_order(pair, client_order_id)
+            if result is not None and result.get('status') not in TERMINAL_STATUSES:
+                await exchange.cancel_order(result['id'], pair)
+                result = await executor.find_order(pair, client_order_id)
+        except Exception as e:
+            logger.error(f"Could not resolve {side} order {client_order_id} for {pair}: {e}")
+            continue
+        if result is not None and result.get('status') not in TERMINAL_STATUSES:
+            logger.warning(f"{side.capitalize()} order {client_order_id} for {pair} is still {result.get('status')}; left pending.")
+            continue
+        if not result or not result.get('filled'):
+            state_journal.append('order_failed', client_order_id=client_order_id, error="not filled before restart")
+            continue
+
+        executor.record_fill(pair, client_order_id, result)
+        logger.info(f"Resolved {side} order {client_order_id} for {pair}: filled {result.get('filled')}.")
+
+async def resume_positions():
+    """
+    Resume monitoring every position left open by a previous run.
+    """
+    await resolve_pending_orders()
+    state_journal.compact()
+    positions = [dict(position) for position in state_journal.positions.values()]
+    if not positions:
+        return
+    for position in positions:
+        if position.get('ratcheted_at_ms'):
+            # Bars scored before the restart must not ratchet the take-profit again
+            candle_scheduler.mark_evaluated('score', position['pair'], settings.TIMEFRAMES_FOR_SCORE, position['ratcheted_at_ms'])
+        logger.info(f"Resuming {position['pair']} position: {position['amount']} at {position['buy_price']}, "
+                    f"Take-Profit {position['take_profit_price']}, Stop-Loss {position['stop_loss_price']}")
+    await send_telegram_message(f"Resuming {len(positions)} open position(s) after restart.")
+    await asyncio.gather(*(monitor_position(position['pair'], position) for position in positions))
+
+async def save_state_snapshot():
+    """
+    Atomically snapshot the candle caches so a restart only fetches the candles it missed.
+    """
+    if not market_data or not market_data.candles:
+        return
+    try:
+        # Only the cache list is taken on the loop; copying, pickling, the write and fsync run on a thread
+        caches = list(market_data.candles.items())
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, write_snapshot, settings.STATE_SNAPSHOT_PATH, caches)
+    except Exception as e:
+        logger.error(f"Error writing state snapshot: {e}")
+
+async def snapshot_periodically():
+    while True:
+        await asyncio.sleep(settings.STATE_SNAPSHOT_INTERVAL)
+        await save_state_snapshot()
+
+async def ratchet_paper_position(pair):
+    """
+    Ratchet the take-profits of the paper positions on `pair` by the indicator score of the scoring timeframes.
+    """
+    try:
+        historical_prices = await fetch_historical_prices_for_score(pair)
+        if historical_prices:
+            paper_engine.ratchet(pair, await run_cpu(calculate_indicator_score, historical_prices))
+            return
+    except Exception as e:
+        logger.error(f"Error ratcheting paper positions on {pair}: {e}")
+    candle_scheduler.invalidate('score', pair)  # Retry on the next check
+
+async def check_paper_exits():
+    """
+    Check the take-profit / stop-loss of every open paper position against the latest prices.
+
+    Take-profits are ratcheted first, once per closed scoring candle, as monitor_position
+    does for live positions, whether or not the pair is due for a rescan.
+
+    Returns:
+        dict: Pair -> last price for the pairs that were checked.
+    """
+    pairs = sorted(paper_engine.open_pairs())
+    due = [pair for pair in pairs if candle_scheduler.should_evaluate('score', pair, settings.TIMEFRAMES_FOR_SCORE)]
+    await asyncio.gather(*(ratchet_paper_position(pair) for pair in due))
+    tickers = await asyncio.gather(*(rate_limited_fetch(fetch_ticker, pair) for pair in pairs))
+    prices = {}
+    for pair, ticker in zip(pairs, tickers):
+        if not ticker or ticker.get('last') is None:
+            continue
+        prices[pair] = ticker['last']
+        order_book = market_data.get_order_book(pair) if market_data else None
+        paper_engine.check_exits(pair, ticker['last'], order_book)
+    return prices
+
 async def advanced_trade():
     """
     Main trading loop with dynamic profit-taking logic.
     """
+    # Exchange REST calls share the tuned connection pool with Telegram
+    http_transport.attach_exchange(exchange, await http_transport.get_session())
+    loop_monitor.start()
+    sweep_profiler.install_signal_handler()
+
     if settings.quote_currency:
         quote_currency = 'USDT'
         pairs = await get_tradeable_pairs(quote_currency)
     else:
         pairs = settings.DESIRED_COINS
 
+    if market_data:
+        # Warm the candle caches from the last snapshot; only missed candles are backfilled
+        snapshot = load_snapshot(settings.STATE_SNAPSHOT_PATH, max_age=settings.STATE_SNAPSHOT_MAX_AGE)
+        if snapshot:
+            market_data.restore_candles(snapshot['candles'], pairs)
+        await market_data.start(pairs)
+        snapshot_task = asyncio.create_task(snapshot_periodically())  # Runs for the lifetime of the loop
+
+    if not paper_engine:
+        await resume_positions()
+
+    scan_scheduler = ScanScheduler(pairs)
+    portfolio = PortfolioAllocator(pairs)
+
+    # Paper mode fetches the union of every strategy's timeframes once per pair
+    scan_timeframes = paper_engine.feed_timeframes if paper_engine else settings.TIMEFRAMES
+    signal_timeframes = paper_engine.timeframes if paper_engine else settings.TIMEFRAMES
+    paper_prices = {}
+    universe_loaded_at = time.monotonic()
+
     while True:
+        batch = []
         try:
-            for pair in pairs:
-                logger.info(f"Processing pair: {pair}")
-
-                # Fetch and preprocess market data
-                historical_prices = await fetch_historical_prices(pair)
-                if not historical_prices:
+            if settings.quote_currency and time.monotonic() - universe_loaded_at >= settings.UNIVERSE_REFRESH_INTERVAL:
+                universe_loaded_at = time.monotonic()
+                pairs = await refresh_universe(pairs, scan_scheduler, portfolio)
+
+            batch = await scan_scheduler.next_batch(settings.SCAN_BATCH_SIZE)
+            sweep_profiler.begin()
+
+            if paper_engine:
+                paper_prices.update(await check_paper_exits())
+
+            # Skip pairs without a newly closed candle since their last evaluation
+            due_pairs = []
+            for pair in batch:
+                if candle_scheduler.should_evaluate('signal', pair, signal_timeframes):
+                    due_pairs.append(pair)
+                else:
+                    scan_scheduler.skip(pair, delay=candle_scheduler.seconds_until_next_close(signal_timeframes))
+
+            # Fetch market data for the whole batch concurrently
+            rest_requests = market_data.stats['rest_fallbacks'] if market_data else None
+            fetched = await asyncio.gather(*(fetch_scan_data(pair, scan_timeframes) for pair in due_pairs))
+            scanned = {}
+            for pair, (historical_prices, order_book) in zip(due_pairs, fetched):
+                if not historical_prices or not order_book:
+                    candle_scheduler.invalidate('signal', pair)
+                    scan_scheduler.skip(pair)
                     continue
+                scanned[pair] = (historical_prices, order_book)
+                if ml_inference:
+                    ml_inference.observe(pair, historical_prices)
+            requests_per_pair = (market_data.stats['rest_fallbacks'] - rest_requests) / len(due_pairs) if market_data and due_pairs else None
 
-                order_book = await fetch_order_book(pair)
-                if not order_book:
-                    continue
+            # Score every pair with a new bar in one batched model call
+            if ml_inference:
+                await ml_inference.predict_pending()
+
+            # Roll the return covariance forward with every newly closed bar in the candle caches
+            if market_data:
+                portfolio.update_from_candles(market_data.candles, candle_scheduler.latest_close(portfolio.timeframe) - portfolio.step)
+
+            buy_candidates = {}
+            for pair, (historical_prices, order_book) in scanned.items():
+                logger.info(f"Processing pair: {pair}")
 
                 # Evaluate trading signals
-                trading_signal = simplified_evaluate_trading_signals(historical_prices, order_book)
+                ml_probability = ml_inference.prediction(pair) if ml_inference else None
+                if paper_engine:
+                    # Every strategy trades on paper; the pair is prioritized by the most eager one
+                    shared = await run_cpu(shared_evaluation, historical_prices, order_book, paper_engine.timeframes)
+                    results = paper_engine.evaluate(pair, historical_prices, order_book, ml_probability=ml_probability, shared=shared)
+                    evaluation = max(results.values(), key=lambda result: (result['signal'] == "buy", result['buy_confidence']))
+                else:
+                    evaluation = await run_cpu(evaluate_signal_confidence, historical_prices, order_book, ml_probability=ml_probability)
+                trading_signal = evaluation['signal']
                 logger.info(f"Trading signal for {pair}: {trading_signal}")
 
-                if trading_signal == "buy":
-                    usdt_balance = await get_balance('USDT')
-                    amount_to_buy = usdt_balance / historical_prices['1m']['close'].iloc[-1]
-                    buy_order = await place_market_order(pair, 'buy', amount_to_buy)
-
-                    if buy_order:
-                        buy_price = historical_prices['1m']['close'].iloc[-1]
-                        logger.info(f"Bought {pair} at {buy_price}")
-
-                        # Dynamic profit-taking loop
-                        profit_percentage = settings.TAKE_PROFIT_PERCENTAGE
-                        profit_step = settings.PROFIT_STEP
-                        max_profit_percentage = settings.MAX_PROFIT_PERCENTAGE
-                        stop_loss_buffer = settings.STOP_LOSS_PERCENTAGE
-
-                        score_time = 0
-
-                        while True:
-                            try:
-                                # Fetch the latest current price
-                                ticker = await rate_limited_fetch(exchange.fetch_ticker, pair)
-                                current_price = ticker['last']  # Get the latest price from the ticker data
-
-                                if score_time % 7 == 0:
-                                    historical_prices = await fetch_historical_prices_for_score(pair)
-                                    if not historical_prices:
-                                        continue
-                                    profit_percentage += calculate_indicator_score(historical_prices) * profit_step
-                                    profit_percentage = min(profit_percentage, max_profit_percentage)
-
-                                    take_profit_price = buy_price * (1 + profit_percentage)
-                                    stop_loss_price = buy_price * (1 - stop_loss_buffer)
-
-                                logger.info(f"Current Price: {current_price:.2f}, Take-Profit: {take_profit_price:.2f}, Stop-Loss: {stop_loss_price:.2f}")
-
-                                score_time += 1
-
-                                # Check if price hits take-profit or stop-loss levels
-                                if current_price >= take_profit_price:
-                                    logger.info(f"Take-Profit triggered! Selling at {current_price}")
-                                    selling = await place_market_order(pair, 'sell', amount_to_buy)
-                                    if not selling:
-                                        await convert_to_usdt(pair)
-                                    break
-                                elif current_price <= stop_loss_price:
-                                    logger.info(f"Stop-Loss triggered! Selling at {current_price}")
-                                    stopping = await place_market_order(pair, 'sell', amount_to_buy)
-                                    if not stopping:
-                                        await convert_to_usdt(pair)
-                                    break
-                                
-                                # Wait before the next iteration
-                                await asyncio.sleep(20)
-                            except Exception as e:
-                                logger.error(f"Error fetching current price or processing trade logic: {e}")
-                                await asyncio.sleep(20)  # Retry after a short delay
-                        await asyncio.sleep(2)
+                # Reprioritize the pair from its recent activity and how close it came to a buy
+                base_timeframe = settings.TIMEFRAMES[0]
+                volatility, volume = pair_activity(historical_prices.get(base_timeframe, next(iter(historical_prices.values()))))
+                scan_scheduler.record(
+                    pair, volatility, volume, evaluation['buy_confidence'],
+                    requests=requests_per_pair,
+                    signal=trading_signal,
+                    bar_close_ms=candle_scheduler.first_unevaluated_close('signal', pair, base_timeframe),
+                )
+
+                if trading_signal == "buy" and not paper_engine:
+                    buy_candidates[pair] = evaluation['buy_confidence']
 
                 # elif 'sell' in trading_signals.values():
                 #     continue
@@ -264,11 +592,24 @@ async def advanced_trade():
                     # await place_market_order(pair, 'sell', asset_balance)
                     # logger.info(f"Sold {pair}")
 
-                    await asyncio.sleep(1)
-
-                await asyncio.sleep(5)
-
-            await asyncio.sleep(10)
+            # Size all buy signals of the sweep together, then monitor the positions concurrently.
+            # The sweep profile ends here; monitoring can last for hours.
+            if buy_candidates:
+                sweep_profiler.end()
+                await buy_and_monitor(buy_candidates, portfolio)
+
+            if scan_scheduler.report_due():
+                scan_scheduler.log_report()
+                candle_scheduler.log_counters()
+                http_transport.log_stats()
+                executor.log_latency()
+                loop_monitor.log_stats()
+                if paper_engine:
+                    paper_engine.log_report(paper_prices)
         except Exception as e:
             logger.error(f"An error occurred during trading: {e}")
+            for pair in batch:
+                scan_scheduler.skip(pair)
             await asyncio.sleep(10)
+        finally:
+            sweep_profiler.end()
\ No newline at end of file